@@ -29,31 +29,60 @@
 #  Missing required fields are caught
 #  Clear error messages are returned
 
-from fastapi import FastAPI, HTTPException, Depends, Request, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, status
 from fastapi.responses import HTMLResponse
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import os
 from core.services.email_service import EmailService, new_email_service
 from core.services.user_service import new_user_service, UserService
 from core.services.token_service import new_token_service, TokenService, TokenPermission
+from core.services.outbox_service import new_outbox_service, OutboxService
+from core.services.campaign_service import new_campaign_service, CampaignService
+from core.services.user_cache import new_user_cache
 from core.clients.mongo_client import MongoClient
-from core.base.models import User, EmailPreferences
-from fastapi.templating import Jinja2Templates
+from core.clients.email_transport import new_email_transport
+from core.clients.mongo_indexes import provision_indexes
+from core.base.models import User, EmailPreferences, CampaignRequest, WriteOutcome, RegistrationOutcome
 from core.repositories.user_repository import UserRepository
+from core.repositories.outbox_repository import OutboxRepository
+from core.repositories.campaign_repository import CampaignRepository
 from core.handlers.env_handler import env
+from core.handlers.rate_limit_handler import new_limiter, limiter_stats, rate_limit_exceeded_handler
+from core.handlers.metrics_handler import MetricsMiddleware
+from core.handlers.tracing_handler import TracingMiddleware
+from core.handlers.profiling_handler import ProfilingMiddleware
+from core.handlers.log_handler import setup_logging, RequestIdMiddleware
+from core.handlers.analytics_handler import AnalyticsMiddleware
+from core.handlers.asset_handler import AssetFiles
+from core.handlers.preview_handler import PreviewCache
+from core.utils.assets import assets
+from core.utils.template_registry import template_registry
+from core.utils.render_pool import new_render_pool
+from core.utils.analytics import analytics
+from core.services.analytics_service import new_analytics_service
+from core.repositories.analytics_repository import AnalyticsRepository
+from core.utils.metrics import metrics
+from core.utils.tracing import tracer, waterfall
+from core.utils.loop_monitor import new_loop_monitor
+from core.utils.profiling import profiles
 from slowapi.middleware import SlowAPIMiddleware
 from functools import lru_cache
-from api_analytics.fastapi import Analytics
+import logging
 # import redis
 
+# Logging (formatted and written off the event loop)
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Redis
-REDIS_URL = f"redis://{env.redis['username']}:{env.redis['password']}@{env.redis['host']}:{env.redis['port']}"
+REDIS_URL = env.redis["url"]
 
 # Env
 NODE_ENV = env.state["node_env"]
@@ -65,8 +94,8 @@ CLIENT_PROD = env.state["client_prod"]
 ALLOW_HEADERS = env.auth["allow_headers"]
 ALLOW_ORIGINS = env.auth["allow_origins"]
 TEMPLATE_BASE = CLIENT_PROD if NODE_ENV == "production" else CLIENT_LOCAL
-ANALYTICS_KEY = env.state["analytics_key"]
 RATE_LIMITED = env.state["rate_limited"] == "True"
+ADMIN_API_KEY = env.admin["api_key"]
 
 def get_client_ip(request: Request):
     real_ip = request.headers.get("x-real-ip")
@@ -90,15 +119,25 @@ for prod_url in ALLOW_ORIGINS:
 
 @lru_cache
 def get_token_service() -> TokenService:
-    return new_token_service(SECRET_KEY, ALGORITHM)
+    return new_token_service(SECRET_KEY, ALGORITHM, env.jwt["cache_size"])
 
-@lru_cache
 def get_email_service() -> EmailService:
-    return new_email_service()
+    return app.email_service
 
 def get_user_service() -> UserService:
     user_repository = UserRepository(app.db["users"])
-    return new_user_service(user_repository)
+    return new_user_service(user_repository, app.user_cache)
+
+def get_outbox_service() -> OutboxService:
+    return app.outbox
+
+def get_campaign_service() -> CampaignService:
+    return app.campaigns
+
+def require_admin(x_admin_key: str = Header(None)):
+    """Guard admin endpoints with the ADMIN_API_KEY header (disabled when unset)"""
+    if not ADMIN_API_KEY or not hmac.compare_digest((x_admin_key or "").encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -106,23 +145,67 @@ async def lifespan(app: FastAPI):
     mongo_client = MongoClient()
     db = await mongo_client.ping()
     app.db = db
+    if env.assets["build_on_startup"]:
+        await asyncio.to_thread(assets.ensure_built, env.assets["source"])
+    template_registry.compile_all()
+    app.render_pool = new_render_pool()
+    await app.render_pool.start()
+    app.loop_monitor = new_loop_monitor()
+    if app.loop_monitor is not None:
+        app.loop_monitor.start()
+    index_build = await provision_indexes(db, background=env.mongo["index_background"])
+    app.user_cache = new_user_cache()
+    
+    # Email delivery (one pooled transport per process)
+    email_transport = new_email_transport()
+    app.email_service = new_email_service(email_transport, app.render_pool)
+    
+    # Email outbox worker
+    outbox_repository = OutboxRepository(db["outbox"])
+    app.outbox = new_outbox_service(outbox_repository, app.email_service)
+    app.outbox.start()
+    
+    # Request analytics
+    app.analytics = new_analytics_service(AnalyticsRepository(db["analytics"]), analytics)
+    app.analytics.start()
+    
+    # Campaigns (resume anything a previous process left unfinished)
+    campaign_repository = CampaignRepository(db["campaigns"], db["campaign_deliveries"])
+    app.campaigns = new_campaign_service(
+        campaign_repository,
+        UserRepository(db["users"]),
+        app.email_service,
+        get_token_service(),
+        app.outbox,
+    )
+    if index_build is None:
+        await app.campaigns.resume_incomplete()
+    else:
+        # Claims rely on the unique delivery index, so wait for the build first
+        index_build.add_done_callback(lambda _: asyncio.create_task(app.campaigns.resume_incomplete()))
     yield
+    await app.campaigns.stop()
+    await app.outbox.stop()
+    await app.analytics.stop()
+    if index_build is not None:
+        index_build.cancel()
+    await app.email_service.close()
+    await email_transport.close()
+    await app.render_pool.close()
+    if app.user_cache is not None:
+        await app.user_cache.close()
     await mongo_client.close()
+    if app.loop_monitor is not None:
+        await app.loop_monitor.stop()
 
-limiter = Limiter(
-    key_func=get_client_ip,
-    # key_func=get_client_ip,
-    # storage_uri=REDIS_URL,
-    # strategy="fixed-window",
-    enabled=RATE_LIMITED
-)
+limiter = new_limiter(key_func=get_client_ip, enabled=RATE_LIMITED)
 
 app = FastAPI(title="Credentials Storage API", lifespan=lifespan)
 
 # Rate limiting configuration
 # limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
 app.add_middleware(
@@ -135,14 +218,91 @@ app.add_middleware(
 
 # Static files
 # https://fastapi.tiangolo.com/tutorial/static-files/
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# https://fastapi.tiangolo.com/advanced/templates/
-templates = Jinja2Templates(directory="templates")
+# Hashed build output is cached forever. /static serves the unoptimised sources, only for
+# links in emails sent before the asset pipeline; templates never link to it, so it is left as is
+os.makedirs(env.assets["output"], exist_ok=True)
+app.mount(env.assets["url_prefix"], AssetFiles(directory=env.assets["output"], max_age=31536000, immutable=True, manifest=assets), name="assets")
+app.mount("/static", AssetFiles(directory="static", max_age=86400), name="static")
+
+# Template previews render fixed mock data, so they are served from memory
+previews = PreviewCache(template_registry)
+
+# Analytics (in-process rollups, flushed to Mongo once per window)
+app.add_middleware(AnalyticsMiddleware, aggregator=analytics, exclude=env.analytics["exclude"])
+
+# Profiling (opt-in per request; results served from /profiles)
+app.add_middleware(ProfilingMiddleware)
+
+# Tracing (sampled per request; waterfalls served from /traces)
+app.add_middleware(TracingMiddleware)
+
+# Metrics (latency covers every other middleware)
+app.add_middleware(MetricsMiddleware)
+
+# Request IDs (outermost, so every log line of a request carries one)
+app.add_middleware(RequestIdMiddleware)
+
+def _cache_stats() -> dict:
+    """In-process cache and limiter counters, read at scrape time"""
+    stats = {}
+    sources = {"token": get_token_service().verified_cache.stats()}
+    if getattr(app, "user_cache", None) is not None:
+        sources["user"] = app.user_cache.stats()
+    for name, storage_stats in limiter_stats(limiter).items():
+        sources[f"rate_limit_{name}"] = storage_stats
+    for cache, values in sources.items():
+        for stat, value in values.items():
+            if isinstance(value, (int, float)):
+                stats[(cache, stat)] = value
+    return stats
+
+metrics.gauge("reach_cache_stat", "Cache and limiter counters", ("cache", "stat"), collect=_cache_stats)
+
+@app.get("/metrics", dependencies=[Depends(require_admin)])
+async def metrics_endpoint():
+    """Prometheus exposition of route, dependency and cache metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/loop", dependencies=[Depends(require_admin)])
+async def loop_report():
+    """Worst loop lag and the stacks of callbacks that blocked the loop"""
+    if getattr(app, "loop_monitor", None) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loop monitor disabled")
+    return JSONResponse(content=app.loop_monitor.stats())
+
+@app.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Most recent request profiles"""
+    return JSONResponse(content=profiles.recent())
+
+@app.get("/profiles/{pid}", dependencies=[Depends(require_admin)])
+async def get_profile(pid: str):
+    """cProfile stats of one request, by cumulative time"""
+    profile = profiles.get(pid)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(profile["stats"])
+
+@app.get("/traces", dependencies=[Depends(require_admin)])
+async def list_traces(limit: int = 50):
+    """Most recent sampled traces"""
+    return JSONResponse(content=[
+        {
+            "trace_id": trace[0]["trace_id"],
+            "name": trace[0]["name"],
+            "duration_ms": trace[0]["duration_ms"],
+            "spans": len(trace),
+        }
+        for trace in tracer.exporter.recent(limit) if trace
+    ])
 
-# Analytics
-# https://pypi.org/project/fastapi-analytics/
-app.add_middleware(Analytics, api_key=ANALYTICS_KEY)
+@app.get("/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str):
+    """Waterfall view of one trace"""
+    trace = tracer.exporter.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return PlainTextResponse(waterfall(trace))
 
 @app.get("/")
 @limiter.limit("3/minute", per_method=True)
@@ -178,6 +338,7 @@ async def register_user(
     user_service: UserService = Depends(get_user_service),
     email_service: EmailService = Depends(get_email_service),
     token_service: TokenService = Depends(get_token_service),
+    outbox_service: OutboxService = Depends(get_outbox_service),
 ):
     """
     Register user in MongoDB and send welcome email if new user.
@@ -185,44 +346,45 @@ async def register_user(
     At least one identifier (email or atproto_did) must be provided.
     """
     try:
-        existing_user = await user_service.get_user(identifier=user.email)
-        if existing_user:
-            if existing_user.preferences.model_dump() == EmailPreferences().model_dump():
-                return JSONResponse(content={
-                    "message": f"You're already on our list! Stay tuned for updates.",
-                })
-            else:
-                _ = await user_service.resubscribe_user(existing_user.uid)
-                return JSONResponse(content={
-                    "message": "Welcome back! You've been successfully resubscribed.",
-                })
+        registration = await user_service.register_user(user.email, user.name, source)
+        if registration.outcome == RegistrationOutcome.AlreadySubscribed:
+            return JSONResponse(content={
+                "message": f"You're already on our list! Stay tuned for updates.",
+            })
+        if registration.outcome == RegistrationOutcome.Resubscribed:
+            return JSONResponse(content={
+                "message": "Welcome back! You've been successfully resubscribed.",
+            })
             
-        new_user = await user_service.create_user(user.email, user.name, source)
+        new_user = registration.user
         if new_user.email:
             preferences_token = await token_service.generate_reach_token(
                 uid=new_user.uid,
                 permission=TokenPermission.ChangePreferences,
             )
-            await email_service.send_welcome_email(
-                email=new_user.email, 
-                name=new_user.name,
-                preferences_token=preferences_token,
-            )
             verification_token = await token_service.generate_reach_token(
                 uid=new_user.uid,
                 email=new_user.email, # add updated email
                 permission=TokenPermission.VerifyEmail,
             )
-            await email_service.send_verify_email(
-                name=new_user.name,
-                email=new_user.email,
-                verification_token=verification_token,
+            await outbox_service.enqueue(
+                await email_service.build_welcome_email(
+                    email=new_user.email, 
+                    name=new_user.name,
+                    preferences_token=preferences_token,
+                ),
+                await email_service.build_verify_email(
+                    name=new_user.name,
+                    email=new_user.email,
+                    verification_token=verification_token,
+                ),
             )
 
         return JSONResponse(content={
             "message": f"Thanks for subscribing! We're excited to have you!",
         })
     except Exception as e:
+        logger.exception("Registration failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error storing credentials: {str(e)}"
@@ -238,6 +400,7 @@ async def update_email_preferences(
     token_service: TokenService = Depends(get_token_service),
     user_service: UserService = Depends(get_user_service),
     email_service: EmailService = Depends(get_email_service),
+    outbox_service: OutboxService = Depends(get_outbox_service),
 ):
     """Update email preferences"""
     
@@ -249,23 +412,15 @@ async def update_email_preferences(
     if not verified:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
     
-    # Get current user data
-    current_user_data = await user_service.get_user(verified["uid"])
-    if not current_user_data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
     is_new_email = False
+    messages = []
     
-    # Update user data
-    updated_user = await user_service.update_user(verified["uid"], user.name, user.email, user.preferences.model_dump())
-    if not updated_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Preferences endpoint failed",
-        )
+    # Update user data (404s if the user is gone)
+    result = await user_service.update_user(verified["uid"], user.name, user.email, user.preferences.model_dump())
+    updated_user = result.user
     
     # Check if email has changed
-    if not current_user_data.email == updated_user.email:
+    if "email" in result.changed:
         is_new_email = True
         await user_service.reset_email_verification(updated_user.uid)
         verification_token = await token_service.generate_reach_token(
@@ -273,11 +428,12 @@ async def update_email_preferences(
             email=updated_user.email, # add updated email
             permission=TokenPermission.VerifyEmail,
         )
-        await email_service.send_verify_email(updated_user.email, verification_token, updated_user.name)
+        messages.append(await email_service.build_verify_email(updated_user.email, verification_token, updated_user.name))
 
     # Check if user is unsubscribed
     if not updated_user.preferences.content and not updated_user.preferences.marketing and not updated_user.preferences.product:
-        await email_service.send_unsubscribe_confirmation_email(updated_user.email, token, updated_user.name)
+        messages.append(await email_service.build_unsubscribe_confirmation_email(updated_user.email, token, updated_user.name))
+    await outbox_service.enqueue(*messages)
 
     return JSONResponse(content={
         "message": f'Preferences updated! {"Please check your inbox." if is_new_email else "You're all set!"}',
@@ -289,9 +445,9 @@ async def unsubscribe(
     request: Request,
     token: str,
     token_service: TokenService = Depends(get_token_service),
-    email_service: EmailService = Depends(new_email_service),
+    email_service: EmailService = Depends(get_email_service),
     user_service: UserService = Depends(get_user_service),
-
+    outbox_service: OutboxService = Depends(get_outbox_service),
 ):
     """Handle unsubscribe requests"""
     
@@ -303,23 +459,16 @@ async def unsubscribe(
     if not verified:
         raise HTTPException(status_code=400, detail="Invalid reach token")
     
-    # Check if already unsubscribed
-    user_data = await user_service.get_user(identifier=verified["uid"])
-    if not user_data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    
-    if not user_data.preferences.marketing and not user_data.preferences.content and not user_data.preferences.product:
+    # Unsubscribe user (a no-op write means they already were)
+    result = await user_service.unsubscribe_user(verified["uid"])
+    if result.outcome == WriteOutcome.Unchanged:
         return JSONResponse(content={
             "message": "You're already unsubscribed! Bye for now :(",
         })
-    
-    # Unsubscribe user
-    user = await user_service.unsubscribe_user(verified["uid"])
-    if not user:
-        raise HTTPException(status_code=500, detail="User not found")
+    user = result.user
     
     # Email/response
-    await email_service.send_unsubscribe_confirmation_email(user.email, token, user.name)
+    await outbox_service.enqueue(await email_service.build_unsubscribe_confirmation_email(user.email, token, user.name))
     return JSONResponse(content={
         "message": "You've been unsubscribed! Bye for now :(",
     })
@@ -341,7 +490,7 @@ async def verify_email(
         if not verified:
             raise HTTPException(status_code=400, detail="Invalid reach token")
         
-        user = await user_service.get_user(identifier=verified["uid"])
+        user = await user_service.get_user(identifier=verified["uid"], fields=("email", "emailVerified"))
         if not user:
             raise HTTPException(status_code=500, detail="User not found")
         
@@ -381,17 +530,58 @@ async def get_user_controller(
             raise HTTPException(status_code=400, detail="Invalid reach token")
         return await user_service.get_user(identifier=verified["uid"])
     except Exception as e:
+        logger.exception("Fetching user failed")
         raise HTTPException(status_code=500, detail=f"Failed to fetch user data: {e}")
 
 
+@app.post("/campaigns", dependencies=[Depends(require_admin)])
+async def create_campaign(
+    request: Request,
+    campaign: CampaignRequest,
+    campaign_service: CampaignService = Depends(get_campaign_service),
+):
+    """Start broadcasting to every verified subscriber of the campaign's preference"""
+    created = await campaign_service.create_campaign(
+        kind=campaign.kind,
+        subject=campaign.subject,
+        template=campaign.template,
+        banner_text=campaign.bannerText,
+        variables=campaign.variables,
+    )
+    return JSONResponse(content={
+        "message": "Campaign started",
+        "cid": created.cid,
+    })
+
+@app.get("/campaigns/{cid}", dependencies=[Depends(require_admin)])
+async def get_campaign(
+    cid: str,
+    campaign_service: CampaignService = Depends(get_campaign_service),
+):
+    """Campaign progress"""
+    return await campaign_service.get_campaign(cid)
+
+@app.post("/campaigns/{cid}/resume", dependencies=[Depends(require_admin)])
+async def resume_campaign(
+    cid: str,
+    campaign_service: CampaignService = Depends(get_campaign_service),
+):
+    """Resume a campaign from its last checkpoint"""
+    campaign = await campaign_service.resume(cid)
+    return JSONResponse(content={
+        "message": f"Campaign {campaign.status}",
+        "cid": campaign.cid,
+    })
+
+
 @app.get("/template/welcome", response_class=HTMLResponse)
 @limiter.limit("3/minute")
 async def test_welcome_email(request: Request):
     """Test endpoint to preview the welcome email template"""
-    return templates.TemplateResponse(
+    return previews.response(
+        request,
         "welcome-email.html",
         {
-            "request": request,
             "name": "Freddy",
             "base_url": BASE_URL,
             "banner_text": "Welcome to the journey",
@@ -405,10 +595,10 @@ async def test_welcome_email(request: Request):
 @limiter.limit("3/minute")
 async def test_unsubscribe_email(request: Request):
     """Test endpoint to preview the product email template"""
-    return templates.TemplateResponse(
+    return previews.response(
+        request,
         "unsubscribe-email.html",
         {
-            "request": request,
             "banner_text": "See you again soon",
             "base_url": BASE_URL,
             "name": "Penelope",
@@ -420,10 +610,10 @@ async def test_unsubscribe_email(request: Request):
 @limiter.limit("3/minute")
 async def test_verify_email_template(request: Request):
     """Test endpoint to preview the verify email template"""
-    return templates.TemplateResponse(
+    return previews.response(
+        request,
         "verify-email.html",
         {
-            "request": request,
             "banner_text": "Verify Your Email Address",
             "base_url": BASE_URL,
             "name": "Rosstipher",
@@ -435,10 +625,10 @@ async def test_verify_email_template(request: Request):
 @limiter.limit("3/minute")
 async def test_product_update(request: Request):
     """Render a product update email with mock data"""
-    return templates.TemplateResponse(
-        "product-email.html", 
+    return previews.response(
+        request,
+        "product-email.html",
         {
-            "request": request,
             "name": "Alex",
             "banner_text": "Product Update",
             "base_url": BASE_URL,
@@ -0,0 +1,48 @@
+import os
+
+# Enough configuration for EnvHandler to load without a .env file
+BENCH_ENV = {
+    "NODE_ENV": "development",
+    "BASE_URL": "http://localhost:8000",
+    "SENDER_EMAIL": "bench@reach-bench.com",
+    "CLIENT_URL_LOCAL": "http://localhost:3000",
+    "CLIENT_URL_PROD": "http://localhost:3000",
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DATABASE_NAME": "devarno",
+    "MAILJET_API_KEY": "bench",
+    "MAILJET_SECRET_KEY": "bench",
+    "ALGORITHM": "HS256",
+    "JWT_SECRET_KEY": "benchmark-secret-key-with-at-least-32-bytes",
+    "ALLOW_HEADERS": "*",
+    "ALLOW_ORIGINS": "http://localhost:3000",
+    "RATE_LIMITED": "False",
+    "USER_CACHE_BACKEND": "local",
+    "EMAIL_TRANSPORT": "mailjet",
+}
+
+def configure_env(**overrides: str):
+    """Fill in BENCH_ENV (anything already exported wins), then apply `overrides`; call before importing core."""
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(overrides)
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Throughput and latency percentiles (milliseconds) for one run"""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
@@ -0,0 +1,125 @@
+"""
+Load benchmark: drives the API in-process against an in-memory Mongo and the fake Mailjet server.
+
+    python -m benchmarks.load_bench --requests 1000 --concurrency 50 --output run.json
+
+Scenarios run in order, since later ones use the users registered first:
+register -> user -> preferences -> verify -> unsubscribe. Rate limiting is
+turned off so the numbers measure the handlers, not the limiter. Prints
+(and optionally writes) one JSON document with throughput and p50/p95/p99
+per scenario, for comparing runs.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from benchmarks.harness import configure_env, summarize
+
+SCENARIOS = ("register", "user", "preferences", "verify", "unsubscribe")
+
+async def _drive(client, requests: list, concurrency: int) -> dict:
+    """Send (method, url, body) requests with at most `concurrency` in flight."""
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    queue = iter(requests)
+
+    async def worker():
+        for method, url, body in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["statuses"] = statuses
+    return result
+
+async def run(requests: int, concurrency: int, mailjet_latency: float, port: int, scenarios: tuple) -> dict:
+    from fakes.mailjet_server import FakeMailjet, running_fake_mailjet
+    fake = FakeMailjet(latency=mailjet_latency)
+    async with running_fake_mailjet(fake, port=port) as mailjet_url:
+        configure_env(RATE_LIMITED="False", EMAIL_TRANSPORT="mailjet", MAILJET_API_URL=mailjet_url)
+        import httpx
+        import app as server
+        from core.services.token_service import TokenPermission
+        from fakes.memory_mongo import MemoryMongoClient
+        server.MongoClient = MemoryMongoClient
+
+        results = {}
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                emails = [f"bench{i}@reach-bench.com" for i in range(requests)]
+                if "register" in scenarios:
+                    results["register"] = await _drive(client, [
+                        ("POST", "/register?source=bench", {"email": email, "name": "Bench"})
+                        for email in emails
+                    ], concurrency)
+
+                # Tokens for the registered users, minted the way the handlers do
+                users = [
+                    document async for document in
+                    server.app.db["users"].find({}, {"uid": 1, "email": 1})
+                ]
+                token_service = server.get_token_service()
+                preference_tokens = [
+                    await token_service.generate_reach_token(uid=user["uid"], permission=TokenPermission.ChangePreferences)
+                    for user in users
+                ]
+                verify_tokens = [
+                    await token_service.generate_reach_token(uid=user["uid"], email=user["email"], permission=TokenPermission.VerifyEmail)
+                    for user in users
+                ]
+                preferences = {"marketing": False, "product": True, "content": True}
+                planned = {
+                    "user": [("GET", f"/user?token={token}", None) for token in preference_tokens],
+                    "preferences": [
+                        ("PUT", f"/preferences?token={token}", {"email": user["email"], "name": "Bench", "preferences": preferences})
+                        for user, token in zip(users, preference_tokens)
+                    ],
+                    "verify": [("GET", f"/verify?token={token}", None) for token in verify_tokens],
+                    "unsubscribe": [("PUT", f"/unsubscribe?token={token}", None) for token in preference_tokens],
+                }
+                for name in SCENARIOS[1:]:
+                    if name in scenarios:
+                        results[name] = await _drive(client, planned[name], concurrency)
+
+            # Let the outbox hand queued emails to the fake before shutting down
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and await server.app.db["outbox"].count_documents({"status": "pending"}):
+                await asyncio.sleep(0.1)
+
+    return {
+        "benchmark": "load",
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "mailjet_latency_s": mailjet_latency,
+            "users": len(users),
+        },
+        "scenarios": results,
+        "emails_delivered": len(fake.messages),
+        "mailjet_requests": fake.requests,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests (and users) per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mailjet-latency", type=float, default=0.05, help="seconds added to each fake Mailjet call")
+    parser.add_argument("--port", type=int, default=8025, help="port for the fake Mailjet server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+    # App logging goes to stderr so stdout stays a single JSON document
+    with redirect_stdout(sys.stderr):
+        report = asyncio.run(run(args.requests, args.concurrency, args.mailjet_latency, args.port, tuple(args.scenarios.split(","))))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
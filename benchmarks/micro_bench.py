@@ -0,0 +1,110 @@
+"""
+Microbenchmarks for the synchronous hot spots of a request: tokens, User validation and template renders.
+
+    python -m benchmarks.micro_bench --iterations 5000
+
+Prints one JSON document with the per-call cost (microseconds) of each case.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from benchmarks.harness import configure_env
+
+def _time_sync(func, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+async def _time_async(func, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        await func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - start) / iterations
+
+async def run(iterations: int, workers: int = 4) -> dict:
+    configure_env()
+    from core.base.models import Campaign, CampaignKind, User
+    from core.clients.email_transport import EmailTransport
+    from core.services.email_service import EmailService
+    from core.utils.render_pool import RenderPool
+    from core.services.token_service import TokenService, TokenPermission
+    from benchmarks.token_service_bench import SECRET, run as run_token_verify
+
+    class NullTransport(EmailTransport):
+        async def send(self, messages: list[dict]) -> list[dict]:
+            return [{"Status": "success"} for _ in messages]
+
+    results = {}
+
+    # Tokens
+    tokens = TokenService(SECRET, "HS256")
+    results["token.generate"] = await _time_async(
+        lambda: tokens.generate_reach_token(uid="BENCH001", permission=TokenPermission.ChangePreferences),
+        iterations,
+    )
+    verify = await run_token_verify(iterations)
+    results["token.verify_uncached"] = verify["uncached_us"] / 1e6
+    results["token.verify_cached"] = verify["cached_us"] / 1e6
+
+    # User construction, as the repository does for every document it reads
+    now = datetime.now(timezone.utc)
+    document = {
+        "uid": "BENCH001",
+        "email": "bench@reach-bench.com",
+        "emailVerified": True,
+        "preferences": {"marketing": True, "product": True, "content": True},
+        "name": "Bench",
+        "source": "bench",
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    results["user.validate"] = _time_sync(lambda: User(**document), iterations)
+    results["user.model_dump"] = _time_sync(User(**document).model_dump, iterations)
+
+    # Single-message template renders, on the thread pool (the transport is never called)
+    email_service = EmailService(NullTransport())
+    results["render.welcome"] = await _time_async(
+        lambda: email_service.build_welcome_email("bench@reach-bench.com", "token", "Bench"),
+        iterations,
+    )
+    results["render.verify"] = await _time_async(
+        lambda: email_service.build_verify_email("bench@reach-bench.com", "token", "Bench"),
+        iterations,
+    )
+    results["render.unsubscribe"] = await _time_async(
+        lambda: email_service.build_unsubscribe_confirmation_email("bench@reach-bench.com", "token", "Bench"),
+        iterations,
+    )
+
+    # Bulk campaign renders on a process pool, per message
+    campaign = Campaign(kind=CampaignKind.Product, subject="Bench", template="product-email.html", bannerText="Bench")
+    recipients = [{"uid": f"BENCH{i:04d}", "email": f"bench{i}@reach-bench.com", "name": "Bench"} for i in range(iterations)]
+    pool = RenderPool(workers=workers)
+    await pool.start()
+    try:
+        bulk = EmailService(NullTransport(), renderer=pool)
+        start = time.perf_counter()
+        async for _ in bulk.build_campaign_emails(campaign, recipients, ["token"] * iterations):
+            pass
+        results[f"render_many.product.{workers}_workers"] = (time.perf_counter() - start) / iterations
+    finally:
+        await pool.close()
+    return {
+        "benchmark": "micro",
+        "iterations": iterations,
+        "per_call_us": {name: round(seconds * 1e6, 3) for name, seconds in results.items()},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="render pool processes for the bulk case")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations, args.workers)), indent=2))
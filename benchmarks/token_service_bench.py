@@ -0,0 +1,49 @@
+"""
+Microbenchmark: TokenService.verify_reach_token with and without the verified-claims cache.
+
+    python -m benchmarks.token_service_bench --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks.harness import configure_env
+
+# Importing core loads the environment (the tracer reads it), so fill it in first
+configure_env()
+from core.services.token_service import TokenService, TokenPermission
+
+SECRET = "benchmark-secret-key-with-at-least-32-bytes"
+
+async def _time_verify(service: TokenService, token: str, iterations: int) -> float:
+    permissions = [TokenPermission.ChangePreferences]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await service.verify_reach_token(token=token, permissions=permissions)
+    return (time.perf_counter() - start) / iterations
+
+async def run(iterations: int) -> dict:
+    uncached = TokenService(SECRET, "HS256", cache_size=0)
+    cached = TokenService(SECRET, "HS256")
+    token = await cached.generate_reach_token(uid="BENCH001", permission=TokenPermission.ChangePreferences)
+    
+    # Warm up both paths (and the cache)
+    await _time_verify(uncached, token, 100)
+    await _time_verify(cached, token, 100)
+    
+    uncached_s = await _time_verify(uncached, token, iterations)
+    cached_s = await _time_verify(cached, token, iterations)
+    return {
+        "benchmark": "token_service.verify_reach_token",
+        "iterations": iterations,
+        "uncached_us": round(uncached_s * 1e6, 3),
+        "cached_us": round(cached_s * 1e6, 3),
+        "saved_us": round((uncached_s - cached_s) * 1e6, 3),
+        "speedup": round(uncached_s / cached_s, 2) if cached_s else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations))))
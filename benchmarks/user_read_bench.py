@@ -0,0 +1,82 @@
+"""
+Microbenchmark: validated full-document user reads vs trusted projected reads.
+
+    python -m benchmarks.user_read_bench --iterations 20000
+
+Times model construction alone (what each path costs in CPU per read) and
+the repository call against the in-memory Mongo. Prints one JSON document.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from benchmarks.harness import configure_env
+
+FIELDS = ("email", "preferences")
+
+def _time_sync(func, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+async def _time_async(func, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        await func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - start) / iterations
+
+async def run(iterations: int) -> dict:
+    configure_env()
+    from core.base.models import User
+    from core.repositories.user_repository import UserRepository, _trusted_user
+    from fakes.memory_mongo import MemoryDatabase
+
+    now = datetime.now(timezone.utc)
+    document = {
+        "uid": "BENCH001",
+        "email": "bench@reach-bench.com",
+        "emailVerified": True,
+        "preferences": {"marketing": True, "product": True, "content": True},
+        "name": "Bench",
+        "source": "bench",
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    projected = {"uid": document["uid"], "email": document["email"], "preferences": document["preferences"]}
+
+    results = {
+        "construct.validated_full": _time_sync(lambda: User(**document), iterations),
+        "construct.trusted_projected": _time_sync(lambda: _trusted_user(dict(projected, preferences=dict(projected["preferences"]))), iterations),
+    }
+
+    repository = UserRepository(MemoryDatabase()["users"])
+    await repository.collection.insert_one(dict(document))
+    results["repository.validated_full"] = await _time_async(lambda: repository._get_user_by_uid("BENCH001"), iterations)
+    results["repository.trusted_projected"] = await _time_async(lambda: repository._get_user_by_uid("BENCH001", FIELDS), iterations)
+
+    # Both paths must agree on the fields the projection asked for
+    full, trusted = await repository._get_user_by_uid("BENCH001"), await repository._get_user_by_uid("BENCH001", FIELDS)
+    assert (full.uid, full.email, full.preferences) == (trusted.uid, trusted.email, trusted.preferences)
+
+    return {
+        "benchmark": "user_repository.read",
+        "iterations": iterations,
+        "fields": list(FIELDS),
+        "per_call_us": {name: round(seconds * 1e6, 3) for name, seconds in results.items()},
+        "speedup": {
+            "construct": round(results["construct.validated_full"] / results["construct.trusted_projected"], 2),
+            "repository": round(results["repository.validated_full"] / results["repository.trusted_projected"], 2),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations)), indent=2))
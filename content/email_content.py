@@ -45,8 +45,8 @@ product_banners = [
     "Shipped some updates based on your feedback 🛠️",
 ]
 
-def get_random_marketing_banner() -> str:
-    return random.choice(marketing_banners)
+def get_random_product_banner() -> str:
+    return random.choice(product_banners)
 
 newsletter = [
     "Latest dev adventures & learnings 📚",
@@ -55,4 +55,7 @@ newsletter = [
     "Latest from my coding journey 🗺️",
     "New tutorial & dev thoughts 📝",
     "Weekly dev dispatch: learnings & updates 📬",
-]
\ No newline at end of file
+]
+
+def get_random_newsletter_banner() -> str:
+    return random.choice(newsletter)
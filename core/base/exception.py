@@ -83,6 +83,15 @@ class ServiceLevelError(Exception):
     def __str__(self):
         return f"ServiceLevelError: {self.message}"
 
+class EmailDeliveryError(Exception):
+    def __init__(self, message: str = "Email provider rejected the message.", status_code: int = None):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+    def __str__(self):
+        return f"EmailDeliveryError: {self.message} Status: {self.status_code or 'No status provided.'}"
+
 class InvalidTokenException(HTTPException):
     def __init__(self, detail: str):
         super().__init__(status_code=401, detail=detail)
\ No newline at end of file
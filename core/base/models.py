@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
+from enum import Enum
 from core.utils.str import random_id
 from datetime import datetime, timezone
 
@@ -31,6 +32,79 @@ class User(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class WriteOutcome(Enum):
+    Updated="updated"
+    Unchanged="unchanged"
+    NotFound="not_found"
+
+class UserWriteResult(BaseModel):
+    """Result of a single-round-trip user write"""
+    outcome: WriteOutcome
+    user: Optional[User] = None
+    changed: list[str] = Field(default_factory=list)
+
+class RegistrationOutcome(Enum):
+    Created="created"
+    AlreadySubscribed="already_subscribed"
+    Resubscribed="resubscribed"
+
+class RegistrationResult(BaseModel):
+    """Result of an atomic insert-or-resubscribe"""
+    outcome: RegistrationOutcome
+    user: User
+
 class UnsubscribeToken(BaseModel):
     email: EmailStr
-    token: str
\ No newline at end of file
+    token: str
+
+class CampaignKind(Enum):
+    """Campaign kinds, each gated by the matching EmailPreferences flag"""
+    Product="product"
+    Content="content"
+    Marketing="marketing"
+
+class CampaignStatus(Enum):
+    Running="running"
+    Completed="completed"
+
+class CampaignRequest(BaseModel):
+    """Admin payload for starting a campaign"""
+    kind: CampaignKind
+    subject: str = Field(..., min_length=2, max_length=150)
+    template: str = "product-email.html"
+    bannerText: Optional[str] = None
+    variables: dict = Field(default_factory=dict)
+
+class Campaign(BaseModel):
+    """Broadcast to every verified subscriber of one preference"""
+    
+    # Required
+    cid: str = Field(default_factory=random_id)
+    kind: CampaignKind
+    subject: str = Field(..., min_length=2, max_length=150)
+    template: str = "product-email.html"
+    bannerText: Optional[str] = None
+    variables: dict = Field(default_factory=dict)
+    
+    # Progress
+    status: CampaignStatus = CampaignStatus.Running
+    lastUid: Optional[str] = None
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0
+    
+    # Lease
+    owner: Optional[str] = None
+    leaseUntil: Optional[datetime] = None
+    
+    # Meta
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    # Customise
+    class Config:
+        use_enum_values = True
+        validate_default = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()
+        }
@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+from core.handlers.env_handler import env
+
+class EmailTransport(ABC):
+    """
+    Base class for email delivery backends.
+
+    Messages use the Mailjet v3.1 message shape (`From`, `To`, `Subject`,
+    `HTMLPart`, `TextPart`) and `send` returns one v3.1-style status dict
+    (`{"Status": "success" | "error", ...}`) per message, in order.
+    """
+    max_batch_size: int = 50
+
+    @abstractmethod
+    async def send(self, messages: list[dict]) -> list[dict]:
+        """Deliver a batch of messages and return their statuses in order."""
+
+    async def close(self):
+        """Release any pooled connections"""
+        pass
+
+def new_email_transport() -> EmailTransport:
+    """EmailTransport factory, selected by EMAIL_TRANSPORT"""
+    transport = env.email["transport"]
+    if transport == "smtp":
+        from core.clients.smtp_client import new_smtp_client
+        return new_smtp_client()
+    if transport == "mailjet":
+        from core.clients.mailjet_client import new_mailjet_client
+        return new_mailjet_client()
+    raise ValueError(f"Unknown EMAIL_TRANSPORT: {transport}")
@@ -0,0 +1,65 @@
+import asyncio
+import httpx
+from core.handlers.env_handler import env
+from core.clients.email_transport import EmailTransport
+from core.base.exception import EmailDeliveryError
+
+class MailjetClient(EmailTransport):
+    """
+    Asyncio-native Mailjet v3.1 client.
+
+    One instance is shared by the whole process so every send reuses the
+    same keep-alive connection pool; `max_concurrency` caps the number of
+    requests in flight towards the provider.
+    """
+    def __init__(self,
+        api_key: str,
+        secret_key: str,
+        base_url: str = "https://api.mailjet.com",
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(api_key, secret_key),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def send(self, messages: list[dict]) -> list[dict]:
+        """POST one or more messages to the v3.1 send endpoint and return their statuses."""
+        async with self._slots:
+            response = await self.client.post("/v3.1/send", json={"Messages": messages})
+        return self._message_statuses(response, len(messages))
+
+    @staticmethod
+    def _message_statuses(response: httpx.Response, expected: int) -> list[dict]:
+        """Map a v3.1 send response back to one status per submitted message"""
+        try:
+            results = response.json().get("Messages")
+        except Exception:
+            results = None
+        if isinstance(results, list) and len(results) == expected:
+            return results
+        raise EmailDeliveryError(message=response.text, status_code=response.status_code)
+
+    async def close(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+def new_mailjet_client() -> MailjetClient:
+    """MailjetClient factory"""
+    return MailjetClient(
+        api_key=env.mailjet["api_key"],
+        secret_key=env.mailjet["secret_key"],
+        base_url=env.mailjet["api_url"],
+        max_connections=env.mailjet["max_connections"],
+        max_concurrency=env.mailjet["max_concurrency"],
+        timeout=env.mailjet["timeout"],
+    )
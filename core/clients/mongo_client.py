@@ -1,3 +1,4 @@
+import logging
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 # from dotenv import load_dotenv
@@ -5,6 +6,8 @@ from datetime import datetime
 from core.handlers.env_handler import env
 # from base.exception import DatabaseConnectionError
 
+logger = logging.getLogger(__name__)
+
 mongo_uri = env.mongo["uri"]
 
 class MongoClient:
@@ -22,13 +25,13 @@ class MongoClient:
         except Exception as e:
             raise Exception(details=str(e)) # DB connection error
         finally:
-            print(f"Database [{db_name}] connected successfully")
+            logger.info("Database [%s] connected successfully", db_name)
             return db
 
     async def close(self):
         """Close MongoDB client"""
         self.client.close()
-        print("MongoDB client closed")
+        logger.info("MongoDB client closed")
 
     def get_client(self):
         """Returns the initialized Mongo client"""
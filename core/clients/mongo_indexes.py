@@ -0,0 +1,149 @@
+import logging
+import asyncio
+from typing import Optional
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+class IndexSpec(BaseModel):
+    """Declarative description of one index"""
+    collection: str
+    keys: list[tuple[str, int]]
+    unique: bool = False
+    partialFilterExpression: Optional[dict] = None
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def options(self) -> dict:
+        options = {}
+        if self.unique:
+            options["unique"] = True
+        if self.partialFilterExpression:
+            options["partialFilterExpression"] = self.partialFilterExpression
+        return options
+
+class IndexReport(BaseModel):
+    """Outcome of one provisioning run, per index name"""
+    created: list[str] = Field(default_factory=list)
+    existing: list[str] = Field(default_factory=list)
+    drifted: list[str] = Field(default_factory=list)
+    unmanaged: list[str] = Field(default_factory=list)
+    failed: list[str] = Field(default_factory=list)
+
+def _segment_index(preference: str) -> IndexSpec:
+    # Equality on the flag and verification, then UID for ordered streaming
+    return IndexSpec(
+        collection="users",
+        keys=[(f"preferences.{preference}", ASCENDING), ("emailVerified", ASCENDING), ("uid", ASCENDING)],
+    )
+
+INDEXES: list[IndexSpec] = [
+    # Users
+    IndexSpec(collection="users", keys=[("email", ASCENDING)], unique=True),
+    IndexSpec(collection="users", keys=[("uid", ASCENDING)], unique=True),
+    _segment_index("product"),
+    _segment_index("content"),
+    _segment_index("marketing"),
+    
+    # Email outbox
+    IndexSpec(collection="outbox", keys=[("status", ASCENDING), ("nextAttemptAt", ASCENDING)]),
+    IndexSpec(collection="outbox", keys=[("status", ASCENDING), ("leaseUntil", ASCENDING)]),
+    IndexSpec(collection="outbox", keys=[("dedupeKey", ASCENDING)], unique=True, partialFilterExpression={"dedupeKey": {"$exists": True}}),
+    
+    # Campaigns
+    IndexSpec(collection="campaigns", keys=[("cid", ASCENDING)], unique=True),
+    IndexSpec(collection="campaigns", keys=[("status", ASCENDING)]),
+    IndexSpec(collection="campaign_deliveries", keys=[("cid", ASCENDING), ("uid", ASCENDING)], unique=True),
+    
+    # Request analytics rollups
+    IndexSpec(collection="analytics", keys=[("route", ASCENDING), ("windowStart", ASCENDING)]),
+]
+
+def _drift(spec: IndexSpec, existing: dict) -> Optional[str]:
+    """Describe how an existing index differs from its spec, if at all"""
+    keys = [(field, int(direction)) for field, direction in existing.get("key", [])]
+    if keys != [tuple(key) for key in spec.keys]:
+        return f"keys {keys} != {spec.keys}"
+    if bool(existing.get("unique")) != spec.unique:
+        return f"unique {bool(existing.get('unique'))} != {spec.unique}"
+    if existing.get("partialFilterExpression") != spec.partialFilterExpression:
+        return "partialFilterExpression differs"
+    return None
+
+async def ensure_indexes(db, specs: list[IndexSpec] = INDEXES, background: bool = False) -> IndexReport:
+    """
+    Create any missing indexes and report drift.
+
+    Idempotent: indexes that already match are left alone. Indexes whose
+    definition differs from the spec are reported, never dropped, so a
+    human decides how to migrate them.
+    """
+    report = IndexReport()
+    by_collection: dict[str, list[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection_name, collection_specs in by_collection.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError:
+            # Collection does not exist yet
+            existing = {}
+        existing_by_keys = {
+            tuple((field, int(direction)) for field, direction in info.get("key", [])): name
+            for name, info in existing.items()
+        }
+
+        for spec in collection_specs:
+            label = f"{collection_name}.{spec.name}"
+            if spec.name in existing:
+                difference = _drift(spec, existing[spec.name])
+                if difference:
+                    report.drifted.append(f"{label} ({difference})")
+                else:
+                    report.existing.append(label)
+                continue
+            other = existing_by_keys.get(tuple(tuple(key) for key in spec.keys))
+            if other:
+                report.drifted.append(f"{label} (exists as {other})")
+                continue
+            try:
+                await collection.create_index(spec.keys, name=spec.name, background=background, **spec.options())
+                report.created.append(label)
+            except PyMongoError as e:
+                report.failed.append(f"{label} ({str(e)})")
+
+        managed = {spec.name for spec in collection_specs}
+        for name in existing:
+            if name != "_id_" and name not in managed:
+                report.unmanaged.append(f"{collection_name}.{name}")
+
+    return report
+
+def log_index_report(report: IndexReport):
+    """Summarise a provisioning run"""
+    logger.info("Indexes: %d created, %d up to date", len(report.created), len(report.existing))
+    for label in report.drifted:
+        logger.warning("Index drift: %s", label)
+    for label in report.unmanaged:
+        logger.warning("Unmanaged index: %s", label)
+    for label in report.failed:
+        logger.error("Index build failed: %s", label)
+
+async def provision_indexes(db, background: bool = False) -> Optional[asyncio.Task]:
+    """Run `ensure_indexes` at startup, optionally without blocking it."""
+    async def run():
+        try:
+            log_index_report(await ensure_indexes(db, background=background))
+        except Exception as e:
+            logger.error("Index provisioning failed: %s", e)
+
+    if background:
+        return asyncio.create_task(run())
+    await run()
+    return None
@@ -0,0 +1,170 @@
+import asyncio
+import aiosmtplib
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Optional
+from core.handlers.env_handler import env
+from core.clients.email_transport import EmailTransport
+
+class SmtpClient(EmailTransport):
+    """
+    Pooled SMTP transport.
+
+    Keeps up to `pool_size` authenticated sessions open and sends many
+    messages over each one before recycling it, so a batch pays for the
+    TCP/TLS handshake and AUTH once per session instead of once per message.
+    A batch is spread across the pool and sent in parallel.
+
+    Commands are not pipelined (RFC 2920): aiosmtplib's protocol reads one
+    reply per command and discards replies that arrive early, so each
+    session waits out MAIL/RCPT/DATA round trips. Sending over several
+    sessions at once is what hides that latency.
+    """
+    def __init__(self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: bool = True,
+        pool_size: int = 4,
+        messages_per_session: int = 100,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.pool_size = max(1, pool_size)
+        self.messages_per_session = messages_per_session
+        self.timeout = timeout
+        
+        # Idle sessions; `None` is a free slot that connects lazily
+        self._pool: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.pool_size):
+            self._pool.put_nowait(None)
+        self._session_sends: dict[int, int] = {}
+
+    async def send(self, messages: list[dict]) -> list[dict]:
+        """Spread the batch across pooled sessions and return statuses in order."""
+        statuses: list[Optional[dict]] = [None] * len(messages)
+        chunks = [list(range(i, len(messages), self.pool_size)) for i in range(min(self.pool_size, len(messages)))]
+        await asyncio.gather(*[self._send_chunk(messages, indexes, statuses) for indexes in chunks])
+        return statuses
+
+    async def close(self):
+        """Politely end every idle session"""
+        while not self._pool.empty():
+            session = self._pool.get_nowait()
+            if session is not None and session.is_connected:
+                try:
+                    await session.quit()
+                except Exception:
+                    session.close()
+
+    async def _send_chunk(self, messages: list[dict], indexes: list[int], statuses: list):
+        """Send several messages over one session, reconnecting once if it drops."""
+        session = await self._acquire()
+        try:
+            for index in indexes:
+                session = await self._recycle_if_worn(session)
+                for attempt in (1, 2):
+                    try:
+                        if session is None or not session.is_connected:
+                            session = await self._connect()
+                        await session.send_message(self._to_email_message(messages[index]))
+                        self._session_sends[id(session)] = self._session_sends.get(id(session), 0) + 1
+                        statuses[index] = self._success(messages[index])
+                        break
+                    except aiosmtplib.SMTPServerDisconnected as e:
+                        session = self._discard(session)
+                        if attempt == 2:
+                            statuses[index] = self._error(e)
+                    except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused) as e:
+                        statuses[index] = self._error(e)
+                        break
+                    except Exception as e:
+                        session = self._discard(session)
+                        statuses[index] = self._error(e)
+                        break
+        finally:
+            await self._release(session)
+
+    async def _acquire(self) -> Optional[aiosmtplib.SMTP]:
+        """Take a session (or a free slot) from the pool, recycling worn-out sessions."""
+        return await self._recycle_if_worn(await self._pool.get())
+
+    async def _recycle_if_worn(self, session: Optional[aiosmtplib.SMTP]) -> Optional[aiosmtplib.SMTP]:
+        """End a session that has sent `messages_per_session` messages; the next send reconnects."""
+        if session is not None and self._session_sends.get(id(session), 0) >= self.messages_per_session:
+            try:
+                await session.quit()
+            except Exception:
+                pass
+            session = self._discard(session)
+        return session
+
+    async def _release(self, session: Optional[aiosmtplib.SMTP]):
+        """Return a session to the pool, dropping it if the server hung up."""
+        if session is not None and not session.is_connected:
+            session = self._discard(session)
+        self._pool.put_nowait(session)
+
+    def _discard(self, session: Optional[aiosmtplib.SMTP]) -> None:
+        """Forget a session and close its socket"""
+        if session is not None:
+            self._session_sends.pop(id(session), None)
+            session.close()
+        return None
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Open and authenticate a new session"""
+        session = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await session.connect()
+        return session
+
+    @staticmethod
+    def _to_email_message(message: dict) -> EmailMessage:
+        """Convert a Mailjet-shaped message into a MIME message"""
+        sender = message["From"]
+        email = EmailMessage()
+        email["From"] = formataddr((sender.get("Name") or "", sender["Email"]))
+        email["To"] = ", ".join(formataddr((r.get("Name") or "", r["Email"])) for r in message["To"])
+        email["Subject"] = message.get("Subject", "")
+        email["Message-ID"] = make_msgid(domain=sender["Email"].split("@")[-1])
+        email.set_content(message.get("TextPart") or "")
+        if message.get("HTMLPart"):
+            email.add_alternative(message["HTMLPart"], subtype="html")
+        return email
+
+    @staticmethod
+    def _success(message: dict) -> dict:
+        return {"Status": "success", "To": [{"Email": r["Email"]} for r in message["To"]]}
+
+    @staticmethod
+    def _error(error: Exception) -> dict:
+        return {"Status": "error", "Errors": [{"ErrorMessage": str(error)}]}
+
+def new_smtp_client() -> SmtpClient:
+    """SmtpClient factory"""
+    return SmtpClient(
+        host=env.smtp["host"],
+        port=env.smtp["port"],
+        username=env.smtp["username"],
+        password=env.smtp["password"],
+        use_tls=env.smtp["use_tls"],
+        start_tls=env.smtp["start_tls"],
+        pool_size=env.smtp["pool_size"],
+        messages_per_session=env.smtp["messages_per_session"],
+        timeout=env.smtp["timeout"],
+    )
@@ -0,0 +1,33 @@
+import time
+from core.utils.analytics import AnalyticsAggregator
+
+class AnalyticsMiddleware:
+    """
+    ASGI middleware feeding per-route counts and latencies to the aggregator.
+
+    Paths under `exclude` (static assets by default) are not recorded;
+    routes are labelled by template, as in MetricsMiddleware.
+    """
+    def __init__(self, app, aggregator: AnalyticsAggregator, exclude: tuple = ("/static",)):
+        self.app = app
+        self.aggregator = aggregator
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.exclude and scope["path"].startswith(self.exclude)):
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.aggregator.record(scope["method"], route, status_code, (time.perf_counter() - start) * 1000)
@@ -0,0 +1,112 @@
+import mimetypes
+import os
+import re
+import stat
+from typing import Optional
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from core.utils.assets import AssetManifest
+
+# `<stem>.<12 hex digest><suffix>`, as written by build_assets
+_HASHED_NAME = re.compile(r"^(?P<stem>[^/]+)\.[0-9a-f]{12}(?P<suffix>\.[^./]+)$")
+
+def _qvalues(header: str) -> dict[str, float]:
+    """`gzip;q=0.5, br` -> {"gzip": 0.5, "br": 1.0}"""
+    values = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            values[name.strip().lower()] = quality
+    return values
+
+class AssetFiles(StaticFiles):
+    """
+    StaticFiles with cache headers and precompressed variants.
+
+    A request for `name` is answered with `name.br` / `name.gz` when the
+    client accepts that encoding (q > 0, highest q first), or `name.webp`
+    when it accepts WebP, and the original otherwise. ETag, If-None-Match
+    and Range handling come from FileResponse. With `immutable`, responses
+    may be cached forever, which is only safe for content-hashed names.
+
+    With a `manifest`, a hashed name from an earlier build (the output
+    directory does not survive deploys) is answered with the current build
+    of the same file, cached for `fallback_max_age` only, so links in
+    emails already sent keep resolving.
+    """
+    def __init__(self, *args, max_age: int = 3600, immutable: bool = False, manifest: Optional[AssetManifest] = None, fallback_max_age: int = 3600, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={max_age}" + (", immutable" if immutable else "")
+        self.manifest = manifest
+        self.fallback_cache_control = f"public, max-age={fallback_max_age}"
+
+    def _variants(self, scope: Scope) -> list[tuple[str, str]]:
+        headers = Headers(scope=scope)
+        encodings = _qvalues(headers.get("accept-encoding", ""))
+        quality = {coding: encodings.get(coding, encodings.get("*", 0.0)) for coding in ("br", "gzip")}
+        variants = [
+            (suffix, coding)
+            for suffix, coding in sorted(((".br", "br"), (".gz", "gzip")), key=lambda variant: -quality[variant[1]])
+            if quality[coding] > 0
+        ]
+        if _qvalues(headers.get("accept", "")).get("image/webp", 0.0) > 0:
+            variants.append((".webp", ""))
+        return variants
+
+    def _current_name(self, path: str) -> Optional[str]:
+        """The current hashed name for a hashed name this build does not have"""
+        match = _HASHED_NAME.match(path)
+        if match is None or self.manifest is None:
+            return None
+        current = self.manifest.entries.get(match.group("stem") + match.group("suffix"))
+        return current if current != path else None
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await self._get_response(path, scope, self.cache_control)
+        except HTTPException as e:
+            current = self._current_name(path) if e.status_code == 404 else None
+            if current is None:
+                raise
+            return await self._get_response(current, scope, self.fallback_cache_control)
+
+    async def _get_response(self, path: str, scope: Scope, cache_control: str) -> Response:
+        response = None
+        for suffix, encoding in self._variants(scope):
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            except (OSError, ValueError):
+                continue
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = self._variant_response(path, suffix, encoding, full_path, stat_result, scope)
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = cache_control
+            response.headers["Vary"] = "Accept-Encoding, Accept"
+        return response
+
+    def _variant_response(self, path: str, suffix: str, encoding: str, full_path: str, stat_result: os.stat_result, scope: Scope) -> Response:
+        if encoding:
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            headers = {"Content-Encoding": encoding}
+        else:
+            media_type = mimetypes.guess_type(path + suffix)[0] or "image/webp"
+            headers = None
+        response = FileResponse(full_path, stat_result=stat_result, media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -15,20 +15,110 @@ class EnvHandler:
             "sender": self.get("SENDER_EMAIL"),
             "client_local": self.get("CLIENT_URL_LOCAL"),
             "client_prod": self.get("CLIENT_URL_PROD"),
-            "analytics_key": self.get("API_ANALYTICS_KEY"),
             "rate_limited": self.get("RATE_LIMITED"),
         }
         self.mongo = {
             "uri": self.get("MONGO_URI"),
             "db": self.get("DATABASE_NAME"),
+            "index_background": self.get("MONGO_INDEX_BACKGROUND", "False") == "True",
+        }
+        self.email = {
+            "transport": self.get("EMAIL_TRANSPORT", "mailjet"),
+            "batch_size": self.get("EMAIL_BATCH_SIZE", 50, cast=int),
+            "batch_window": self.get("EMAIL_BATCH_WINDOW", 0.05, cast=float),
         }
         self.mailjet = {
             "api_key": self.get("MAILJET_API_KEY"),
             "secret_key": self.get("MAILJET_SECRET_KEY"),
+            "api_url": self.get("MAILJET_API_URL", "https://api.mailjet.com"),
+            "max_connections": self.get("MAILJET_MAX_CONNECTIONS", 20, cast=int),
+            "max_concurrency": self.get("MAILJET_MAX_CONCURRENCY", 10, cast=int),
+            "timeout": self.get("MAILJET_TIMEOUT", 10.0, cast=float),
+        }
+        self.smtp = {
+            "host": self.get("SMTP_HOST", "localhost"),
+            "port": self.get("SMTP_PORT", 587, cast=int),
+            "username": self.get("SMTP_USERNAME", ""),
+            "password": self.get("SMTP_PASSWORD", ""),
+            "use_tls": self.get("SMTP_USE_TLS", "False") == "True",
+            # Local relays and fakes/smtp_server.py speak plain SMTP
+            "start_tls": self.get("SMTP_START_TLS", str(self.get("SMTP_HOST", "localhost") not in ("localhost", "127.0.0.1", "::1"))) == "True",
+            "pool_size": self.get("SMTP_POOL_SIZE", 4, cast=int),
+            "messages_per_session": self.get("SMTP_MESSAGES_PER_SESSION", 100, cast=int),
+            "timeout": self.get("SMTP_TIMEOUT", 30.0, cast=float),
+        }
+        self.outbox = {
+            # In-flight deliveries bound how many messages the batcher can coalesce into one provider call
+            "concurrency": self.get("OUTBOX_CONCURRENCY", self.email["batch_size"], cast=int),
+            "poll_interval": self.get("OUTBOX_POLL_INTERVAL", 5.0, cast=float),
+            "max_attempts": self.get("OUTBOX_MAX_ATTEMPTS", 8, cast=int),
+        }
+        self.cache = {
+            # "local" never sees other workers' invalidations; use it only with a single worker
+            "backend": self.get("USER_CACHE_BACKEND", "off"),
+            "ttl": self.get("USER_CACHE_TTL", 60.0, cast=float),
+            "max_size": self.get("USER_CACHE_MAX_SIZE", 10000, cast=int),
+        }
+        self.campaign = {
+            "batch_size": self.get("CAMPAIGN_BATCH_SIZE", 200, cast=int),
+            "chunk_size": self.get("CAMPAIGN_CHUNK_SIZE", 50, cast=int),
+            "rate": self.get("CAMPAIGN_RATE", 50.0, cast=float),
+        }
+        self.templates = {
+            "cache_dir": self.get("TEMPLATE_CACHE_DIR", ".template_cache"),
+            "auto_reload": self.get("TEMPLATE_AUTO_RELOAD", str(self.state["node_env"] != "production")) == "True",
+            "compile": self.get("TEMPLATE_COMPILE", "True") == "True",
+        }
+        self.render = {
+            "workers": self.get("RENDER_WORKERS", min(4, os.cpu_count() or 1), cast=int),
+            "chunk_size": self.get("RENDER_CHUNK_SIZE", 32, cast=int),
+        }
+        self.assets = {
+            "source": self.get("ASSET_SOURCE", "static"),
+            "output": self.get("ASSET_OUTPUT", ".assets"),
+            "url_prefix": self.get("ASSET_URL_PREFIX", "/assets"),
+            "build_on_startup": self.get("ASSET_BUILD_ON_STARTUP", "True") == "True",
+        }
+        self.analytics = {
+            "sample_rate": self.get("ANALYTICS_SAMPLE_RATE", 1.0, cast=float),
+            "window": self.get("ANALYTICS_WINDOW", 60.0, cast=float),
+            "max_series": self.get("ANALYTICS_MAX_SERIES", 1000, cast=int),
+            "exclude": parse_env_var_to_list(self.get("ANALYTICS_EXCLUDE", "/static|/assets")),
+        }
+        self.logging = {
+            "level": self.get("LOG_LEVEL", "INFO"),
+            "levels": self.get("LOG_LEVELS", ""),
+            "format": self.get("LOG_FORMAT", "json"),
+            "queue_size": self.get("LOG_QUEUE_SIZE", 10000, cast=int),
+            "rate_limit_interval": self.get("LOG_RATE_LIMIT_INTERVAL", 60.0, cast=float),
+            "rate_limit_burst": self.get("LOG_RATE_LIMIT_BURST", 5, cast=int),
+        }
+        self.tracing = {
+            "sample_rate": self.get("TRACE_SAMPLE_RATE", 0.0, cast=float),
+            "exporter": self.get("TRACE_EXPORTER", "memory"),
+            "file": self.get("TRACE_FILE", "traces.jsonl"),
+            "file_max_bytes": self.get("TRACE_FILE_MAX_BYTES", 10_000_000, cast=int),
+            "file_backups": self.get("TRACE_FILE_BACKUPS", 3, cast=int),
+            "buffer_size": self.get("TRACE_BUFFER_SIZE", 200, cast=int),
+        }
+        self.profiling = {
+            "sample_rate": self.get("PROFILE_SAMPLE_RATE", 0.0, cast=float),
+            "buffer_size": self.get("PROFILE_BUFFER_SIZE", 50, cast=int),
+            "directory": self.get("PROFILE_DIR", ""),
+        }
+        self.loop_monitor = {
+            "enabled": self.get("LOOP_MONITOR", "True") == "True",
+            "interval": self.get("LOOP_LAG_INTERVAL", 0.1, cast=float),
+            "block_threshold": self.get("LOOP_BLOCK_THRESHOLD", 0.1, cast=float),
+            "max_reports": self.get("LOOP_BLOCK_REPORTS", 50, cast=int),
+        }
+        self.admin = {
+            "api_key": self.get("ADMIN_API_KEY", ""),
         }
         self.jwt = {
             "algorithm": self.get("ALGORITHM"),
             "secret": self.get("JWT_SECRET_KEY"),
+            "cache_size": self.get("TOKEN_CACHE_MAX_SIZE", 10000, cast=int),
         }
         self.auth = {
             "allow_headers": parse_env_var_to_list(self.get("ALLOW_HEADERS")),
@@ -40,6 +130,13 @@ class EnvHandler:
             "username": os.getenv("REDIS_USERNAME"),
             "password": os.getenv("REDIS_PASSWORD")
         }
+        self.redis["url"] = f"redis://{self.redis['username']}:{self.redis['password']}@{self.redis['host']}:{self.redis['port']}"
+        self.rate_limit = {
+            "storage": self.get("RATE_LIMIT_STORAGE", "memory"),
+            "strategy": self.get("RATE_LIMIT_STRATEGY", "moving-window"),
+            "redis_timeout": self.get("RATE_LIMIT_REDIS_TIMEOUT", 0.05, cast=float),
+            "max_keys": self.get("RATE_LIMIT_MAX_KEYS", 100000, cast=int),
+        }
         
 
     def get(self, key: str, default: t.Union[t.Any, None] = None, cast: t.Union[type, None] = None) -> any:
@@ -0,0 +1,202 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from core.handlers.env_handler import env
+from core.utils.metrics import LOG_RECORDS_DROPPED
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("reach_request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "suppressed", "dropped"}
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `burst` warnings/errors per call site and message
+    template every `interval` seconds, so an outage logs a handful of lines
+    instead of one per failed request. The first record after a window
+    reports how many were suppressed.
+    """
+    def __init__(self, interval: float = 60.0, burst: int = 5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.windows: dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.name, record.lineno, record.msg)
+        now = time.monotonic()
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if len(self.windows) > 10_000:
+                self.windows.clear()
+            suppressed = window[2] if window is not None else 0
+            self.windows[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, timestamped in UTC"""
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "suppressed", None):
+            entry["suppressed"] = record.suppressed
+        if getattr(record, "dropped", None):
+            entry["dropped"] = record.dropped
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for local development"""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "request_id", None):
+            line += f" [request_id={record.request_id}]"
+        if getattr(record, "suppressed", None):
+            line += f" [{record.suppressed} similar suppressed]"
+        if getattr(record, "dropped", None):
+            line += f" [{record.dropped} records dropped before this]"
+        return line
+
+class _LoopQueueHandler(QueueHandler):
+    """
+    Enqueue records without formatting them on the event loop.
+
+    The queue never leaves the process, so records are passed as-is (no
+    pickling); only the message is resolved now, so later mutation of its
+    arguments can't change what gets logged. When the queue is full (stdout
+    can't keep up), records are dropped rather than blocking the loop or
+    growing memory; the next record that fits reports how many were lost.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self._unreported:
+            record.dropped = self._unreported
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            LOG_RECORDS_DROPPED.inc()
+        else:
+            self._unreported = 0
+
+class _LoopQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown; the listener thread is draining it
+        self.queue.put(self._sentinel, timeout=5.0)
+
+_listener: Optional[QueueListener] = None
+
+def _parse_levels(value: str) -> dict[str, str]:
+    """"core.services.outbox_service=DEBUG,httpx=WARNING" -> {logger: level}"""
+    levels = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging() -> QueueListener:
+    """
+    Route all logging through a queue drained by a background thread, which
+    formats and writes to stdout. Configured by LOG_LEVEL, LOG_LEVELS
+    (per-module overrides), LOG_FORMAT (json|text), LOG_QUEUE_SIZE and the
+    LOG_RATE_LIMIT_* settings. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    config = env.logging
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if config["format"] == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=config["queue_size"])
+    handler = _LoopQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(RateLimitFilter(config["rate_limit_interval"], config["rate_limit_burst"]))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(config["level"].upper())
+    for name, level in _parse_levels(config["levels"]).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = _LoopQueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving each request an ID for log correlation.
+
+    An incoming `X-Request-ID` is reused (so IDs can be followed across
+    services), otherwise one is generated; it is echoed on the response.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope.get("headers", [])).get(b"x-request-id", b"")
+        request_id = incoming.decode("latin-1")[:64] if incoming else os.urandom(8).hex()
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
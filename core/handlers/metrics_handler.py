@@ -0,0 +1,33 @@
+import time
+from core.utils.metrics import HTTP_REQUESTS, HTTP_LATENCY
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and status counts.
+
+    Routes are labelled by their template (e.g. `/campaigns/{cid}`), or the
+    mount path for mounted apps, so label cardinality stays bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            label = getattr(route, "path", None) or scope.get("root_path") or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], label)
+            HTTP_REQUESTS.inc(scope["method"], label, status_code)
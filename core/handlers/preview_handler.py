@@ -0,0 +1,63 @@
+import gzip
+import hashlib
+import os
+from typing import NamedTuple
+from starlette.requests import Request
+from starlette.responses import Response
+from core.utils.template_registry import TemplateRegistry
+
+class RenderedPage(NamedTuple):
+    body: bytes
+    gzipped: bytes
+    etag: str
+
+class PreviewCache:
+    """
+    Rendered template pages served from memory with strong ETags.
+
+    Each preview renders one template with fixed mock data, so pages are
+    cached by template name and the templates' last modification time.
+    With the registry auto-reloading (development), that mtime is the
+    newest of the template files and stylesheet, so edits show up on the
+    next load; otherwise templates never change and it is not checked.
+
+    Every page is kept with a precompressed gzip body. Requests whose
+    `If-None-Match` matches get a bodiless 304.
+    """
+    def __init__(self, registry: TemplateRegistry):
+        self.registry = registry
+        self.pages: dict[tuple[str, float], RenderedPage] = {}
+
+    def _mtime(self) -> float:
+        if not self.registry.auto_reload:
+            return 0.0
+        paths = [entry.path for entry in os.scandir(self.registry.directory) if entry.is_file()]
+        if self.registry.stylesheet:
+            paths.append(self.registry.stylesheet)
+        return max((os.path.getmtime(path) for path in paths if os.path.exists(path)), default=0.0)
+
+    def page(self, name: str, variables: dict) -> RenderedPage:
+        key = (name, self._mtime())
+        page = self.pages.get(key)
+        if page is None:
+            body = self.registry.render(name, variables).encode()
+            page = RenderedPage(body, gzip.compress(body, compresslevel=9, mtime=0), hashlib.sha256(body).hexdigest()[:32])
+            # Drop pages rendered from older sources
+            for stale in [cached for cached in self.pages if cached[0] == name]:
+                del self.pages[stale]
+            self.pages[key] = page
+        return page
+
+    def response(self, request: Request, name: str, variables: dict) -> Response:
+        """Cached page for `name` as a 200, gzipped 200 or 304"""
+        page = self.page(name, variables)
+        gzipped = "gzip" in request.headers.get("accept-encoding", "")
+        etag = f'"{page.etag}-gzip"' if gzipped else f'"{page.etag}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(page.gzipped, media_type="text/html", headers=headers)
+        return Response(page.body, media_type="text/html", headers=headers)
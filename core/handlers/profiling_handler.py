@@ -0,0 +1,45 @@
+import hmac
+import os
+import time
+from core.handlers.env_handler import env
+from core.utils.profiling import profiles
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling opted-in requests.
+
+    A request is profiled when it carries `X-Profile: 1` together with a
+    valid `X-Admin-Key`, or when it falls in PROFILE_SAMPLE_RATE. Profiled
+    responses carry an `X-Profile-Id` header; the stats are served from
+    /profiles. Everything else pays one header scan.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.admin_key = env.admin["api_key"].encode()
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        if headers.get(b"x-profile") != b"1" or not self.admin_key:
+            return False
+        return hmac.compare_digest(headers.get(b"x-admin-key", b""), self.admin_key)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self._requested(scope) or profiles.should_sample()):
+            return await self.app(scope, receive, send)
+
+        profiler = profiles.begin()
+        if profiler is None:
+            return await self.app(scope, receive, send)
+
+        pid = os.urandom(6).hex()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", pid.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiles.end(profiler, pid, scope["method"], scope["path"], time.perf_counter() - start)
@@ -0,0 +1,158 @@
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from typing import Callable, Optional
+from fastapi import Request
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.wrappers import Limit
+from limits import RateLimitItem, parse_many
+from limits.storage import storage_from_string
+from limits.aio.strategies import STRATEGIES as ASYNC_STRATEGIES
+from limits.strategies import STRATEGIES
+from core.handlers.env_handler import env
+from core.handlers.rate_limit_storage import BoundedMemoryStorage
+from core.utils.metrics import RATE_LIMIT_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+class AsyncLimiter(Limiter):
+    """
+    slowapi Limiter whose async routes are checked against a `limits.aio`
+    storage (`async+redis://...`), so a limited request awaits Redis
+    instead of blocking the event loop on a socket read.
+
+    slowapi still registers the limits, raises RateLimitExceeded and
+    writes the headers; its own synchronous check is skipped because the
+    wrapper marks the request as already limited. While the async storage
+    is failing, limits are counted in a BoundedMemoryStorage and Redis is
+    retried with exponential backoff (1s up to 32s).
+    """
+    def __init__(self,
+        key_func: Callable,
+        storage_uri: str,
+        storage_options: Optional[dict] = None,
+        strategy: str = "moving-window",
+        in_memory_fallback_enabled: bool = False,
+        fallback_max_keys: int = 100_000,
+        **options,
+    ):
+        super().__init__(
+            key_func=key_func,
+            strategy=strategy,
+            # Never consulted for async routes; sync routes fall back to local counters
+            storage_uri=f"bounded-memory://?max_keys={fallback_max_keys}",
+            **options,
+        )
+        self.key_func = key_func
+        self.async_storage = storage_from_string(storage_uri, implementation="redispy", **(storage_options or {}))
+        self.async_limiter = ASYNC_STRATEGIES[strategy](self.async_storage)
+        self.fallback_storage: Optional[BoundedMemoryStorage] = None
+        self.fallback_limiter = None
+        if in_memory_fallback_enabled:
+            self.fallback_storage = BoundedMemoryStorage(max_keys=fallback_max_keys)
+            self.fallback_limiter = STRATEGIES[strategy](self.fallback_storage)
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def limit(self, limit_value: str, per_method: bool = False, **kwargs) -> Callable:
+        register = super().limit(limit_value, per_method=per_method, **kwargs)
+        items = list(parse_many(limit_value))
+
+        def decorator(func: Callable) -> Callable:
+            wrapped = register(func)
+            if not asyncio.iscoroutinefunction(func):
+                return wrapped
+            position = list(inspect.signature(func).parameters).index("request")
+
+            @functools.wraps(func)
+            async def checked(*args, **kwargs):
+                request = kwargs.get("request", args[position] if len(args) > position else None)
+                if self.enabled and not getattr(request.state, "_rate_limiting_complete", False):
+                    await self._check(request, items, per_method)
+                    request.state._rate_limiting_complete = True
+                return await wrapped(*args, **kwargs)
+            return checked
+        return decorator
+
+    async def _check(self, request: Request, items: list[RateLimitItem], per_method: bool):
+        key = self.key_func(request)
+        scope = request["path"] + (f":{request.method}" if per_method else "")
+        request.state.view_rate_limit = (min(items), [key, scope]) if items else None
+        for item in items:
+            if not await self._hit(item, key, scope):
+                logger.warning("ratelimit %s (%s) exceeded at endpoint: %s", item, key, scope)
+                request.state.view_rate_limit = (item, [key, scope])
+                raise RateLimitExceeded(Limit(item, self.key_func, scope, per_method, None, None, None, 1, True))
+
+    async def _hit(self, item: RateLimitItem, key: str, scope: str) -> bool:
+        if self._failures and time.monotonic() < self._retry_at:
+            return self.fallback_limiter.hit(item, key, scope)
+        try:
+            allowed = await self.async_limiter.hit(item, key, scope)
+        except Exception as e:
+            if self.fallback_limiter is None:
+                raise
+            self._failures += 1
+            self._retry_at = time.monotonic() + 2 ** min(self._failures - 1, 5)
+            logger.warning("Rate limit storage unreachable, counting locally: %s", e)
+            return self.fallback_limiter.hit(item, key, scope)
+        if self._failures:
+            logger.info("Rate limit storage recovered")
+            self._failures = 0
+        return allowed
+
+def new_limiter(key_func: Callable, enabled: bool = True) -> Limiter:
+    """
+    Limiter factory, backed by RATE_LIMIT_STORAGE (memory|redis).
+
+    With Redis, every worker shares the same counters and each check is
+    awaited through the asyncio Redis client (see AsyncLimiter). Short
+    socket timeouts make a slow Redis count as down, and limits are then
+    counted per process until it answers again. Local counters use
+    BoundedMemoryStorage, which caps the number of tracked keys; it is
+    also the stand-in for tests.
+    """
+    storage = env.rate_limit["storage"]
+    strategy = env.rate_limit["strategy"]
+    max_keys = env.rate_limit["max_keys"]
+    if storage == "redis":
+        timeout = env.rate_limit["redis_timeout"]
+        return AsyncLimiter(
+            key_func=key_func,
+            storage_uri=f"async+{env.redis['url']}",
+            storage_options={
+                "socket_timeout": timeout,
+                "socket_connect_timeout": timeout,
+                "retry_on_timeout": False,
+            },
+            strategy=strategy,
+            in_memory_fallback_enabled=True,
+            fallback_max_keys=max_keys,
+            enabled=enabled,
+        )
+    if storage == "memory":
+        return Limiter(
+            key_func=key_func,
+            strategy=strategy,
+            storage_uri=f"bounded-memory://?max_keys={max_keys}",
+            enabled=enabled,
+        )
+    raise ValueError(f"Unknown RATE_LIMIT_STORAGE: {storage}")
+
+def limiter_stats(limiter: Limiter) -> dict:
+    """Size and eviction counters of the in-process limiter store(s)"""
+    stats = {}
+    for name, storage in (("storage", limiter.limiter.storage), ("fallback", getattr(limiter, "fallback_storage", None))):
+        if isinstance(storage, BoundedMemoryStorage):
+            stats[name] = storage.stats()
+    return stats
+
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """slowapi's 429 handler, counting rejections per route"""
+    route = request.scope.get("route")
+    RATE_LIMIT_REJECTIONS.inc(getattr(route, "path", "unmatched"))
+    return _rate_limit_exceeded_handler(request, exc)
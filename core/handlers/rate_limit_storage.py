@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from math import floor
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+from limits.storage.base import (
+    MovingWindowSupport,
+    SlidingWindowCounterSupport,
+    Storage,
+    TimestampedSlidingWindow,
+)
+
+class _Slot:
+    """Window state for one key: a counter, or the last `limit` hit timestamps"""
+    __slots__ = ("expires_at", "count", "events")
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.count = 0
+        self.events: Optional[deque] = None
+
+class BoundedMemoryStorage(Storage, MovingWindowSupport, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    In-process rate limit storage with a hard cap on tracked keys.
+
+    Keys live in one LRU-ordered map. Expired keys are dropped lazily and
+    swept from the cold end on every write, and once `max_keys` is reached
+    the least recently used key is evicted, so a flood of spoofed client
+    IPs costs at most `max_keys` small slots instead of unbounded memory.
+    Moving windows keep only the newest `limit` timestamps per key.
+
+        bounded-memory://?max_keys=100000
+    """
+    STORAGE_SCHEME = ["bounded-memory"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, max_keys: int = 100_000, **options):
+        if uri:
+            query = parse_qs(urlparse(uri).query)
+            if "max_keys" in query:
+                max_keys = int(query["max_keys"][0])
+        self.max_keys = int(max_keys)
+        self.slots: OrderedDict[str, _Slot] = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self.slots),
+            "max_keys": self.max_keys,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # Slot management
+    def _live(self, key: str, now: float) -> Optional[_Slot]:
+        slot = self.slots.get(key)
+        if slot is not None and slot.expires_at <= now:
+            del self.slots[key]
+            self.expirations += 1
+            return None
+        return slot
+
+    def _touch(self, key: str, now: float, expiry: float) -> _Slot:
+        slot = self._live(key, now)
+        if slot is None:
+            self._make_room(now)
+            slot = _Slot(now + expiry)
+            self.slots[key] = slot
+        else:
+            self.slots.move_to_end(key)
+        return slot
+
+    def _make_room(self, now: float, sweep: int = 8):
+        # Drop a few expired keys from the cold end, then evict LRU if still full
+        for _ in range(sweep):
+            if not self.slots:
+                return
+            key, slot = next(iter(self.slots.items()))
+            if slot.expires_at > now:
+                break
+            del self.slots[key]
+            self.expirations += 1
+        while len(self.slots) >= self.max_keys:
+            self.slots.popitem(last=False)
+            self.evictions += 1
+
+    # Fixed window / counters
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        with self.lock:
+            slot = self._touch(key, time.time(), expiry)
+            slot.count += amount
+            return slot.count
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self.lock:
+            slot = self._live(key, time.time())
+            if slot is None:
+                return 0
+            slot.count = max(slot.count - amount, 0)
+            return slot.count
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            slot = self._live(key, time.time())
+            return slot.count if slot is not None else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self.lock:
+            now = time.time()
+            slot = self._live(key, now)
+            return slot.expires_at if slot is not None else now
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            self.slots.pop(key, None)
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> Optional[int]:
+        with self.lock:
+            count = len(self.slots)
+            self.slots.clear()
+            return count
+
+    # Moving window
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self.lock:
+            now = time.time()
+            slot = self._touch(key, now, expiry)
+            if slot.events is None or slot.events.maxlen != limit:
+                slot.events = deque(maxlen=limit)
+            events = slot.events
+            
+            # The hit that would fall out of the window must already be outside it
+            boundary = limit - amount + 1
+            if len(events) >= boundary and events[-boundary] >= now - expiry:
+                return False
+            events.extend([now] * amount)
+            slot.expires_at = now + expiry
+            return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        with self.lock:
+            now = time.time()
+            slot = self._live(key, now)
+            if slot is None or not slot.events:
+                return now, 0
+            in_window = [timestamp for timestamp in slot.events if timestamp >= now - expiry]
+            if not in_window:
+                return now, 0
+            return in_window[0], len(in_window)
+
+    # Sliding window counter
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._sliding_window_info(previous_key, current_key, expiry, now)
+        if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if floor(previous_count * previous_ttl / expiry + current_count) > limit:
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_window_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
+
+    def _sliding_window_info(self, previous_key: str, current_key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
@@ -0,0 +1,41 @@
+import hmac
+from core.handlers.env_handler import env
+from core.utils.tracing import tracer
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of each request.
+
+    Requests are sampled at TRACE_SAMPLE_RATE; an `X-Trace: 1` header with
+    a valid `X-Admin-Key` forces sampling. Sampled responses carry an
+    `X-Trace-Id` header to look the waterfall up by.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.admin_key = env.admin["api_key"].encode()
+
+    def _forced(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        if headers.get(b"x-trace") != b"1" or not self.admin_key:
+            return False
+        return hmac.compare_digest(headers.get(b"x-admin-key", b""), self.admin_key)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with tracer.start_trace(f"{scope['method']} {scope['path']}", force=self._forced(scope)) as span:
+            if span is None:
+                return await self.app(scope, receive, send)
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set(status=message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"], (b"x-trace-id", span.trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+            route = scope.get("route")
+            if getattr(route, "path", None):
+                span.set(route=route.path)
@@ -0,0 +1,12 @@
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+class AnalyticsRepository:
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def _insert_rollups(self, rollups: list[dict]) -> int:
+        """Persist one window of per-route rollups in a single write."""
+        if not rollups:
+            return 0
+        result = await self.collection.insert_many(rollups, ordered=False)
+        return len(result.inserted_ids)
@@ -0,0 +1,137 @@
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from core.base.models import Campaign, CampaignStatus
+
+CLAIMED = "claimed"
+QUEUED = "queued"
+SENT = "sent"
+FAILED = "failed"
+
+class CampaignRepository:
+    def __init__(self, campaigns: AsyncIOMotorCollection, deliveries: AsyncIOMotorCollection):
+        self.campaigns = campaigns
+        self.deliveries = deliveries
+
+    async def _create_campaign(self, campaign: Campaign) -> Campaign:
+        """Insert a new campaign."""
+        await self.campaigns.insert_one(campaign.model_dump())
+        return campaign
+
+    async def _get_campaign(self, cid: str) -> Optional[Campaign]:
+        """Retrieve a campaign by CID."""
+        data = await self.campaigns.find_one({"cid": cid})
+        if data:
+            return Campaign(**data)
+        return None
+
+    async def _running_campaign_ids(self) -> list[str]:
+        """CIDs of every campaign that has not finished."""
+        cursor = self.campaigns.find({"status": CampaignStatus.Running.value}, {"_id": 0, "cid": 1})
+        return [doc["cid"] async for doc in cursor]
+
+    async def _lease_campaign(self, cid: str, owner: str, lease: timedelta) -> Optional[Campaign]:
+        """Take (or renew) the exclusive right to send a running campaign."""
+        now = datetime.now(timezone.utc)
+        data = await self.campaigns.find_one_and_update(
+            {
+                "cid": cid,
+                "status": CampaignStatus.Running.value,
+                "$or": [{"owner": None}, {"owner": owner}, {"leaseUntil": {"$lte": now}}],
+            },
+            {"$set": {"owner": owner, "leaseUntil": now + lease, "updatedAt": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if data:
+            return Campaign(**data)
+        return None
+
+    async def _release_campaign(self, cid: str, owner: str):
+        """Give up the lease so another worker can resume immediately."""
+        await self.campaigns.update_one(
+            {"cid": cid, "owner": owner},
+            {"$set": {"owner": None, "leaseUntil": None}},
+        )
+
+    async def _checkpoint(self,
+        cid: str,
+        owner: str,
+        lease: timedelta,
+        last_uid: str,
+        sent: int,
+        failed: int,
+        skipped: int,
+    ) -> Optional[Campaign]:
+        """Persist progress after a batch and renew the lease; None if the lease was lost."""
+        now = datetime.now(timezone.utc)
+        data = await self.campaigns.find_one_and_update(
+            {"cid": cid, "owner": owner},
+            {
+                "$set": {"lastUid": last_uid, "leaseUntil": now + lease, "updatedAt": now},
+                "$inc": {"sent": sent, "failed": failed, "skipped": skipped},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if data:
+            return Campaign(**data)
+        return None
+
+    async def _complete_campaign(self, cid: str, owner: str) -> bool:
+        """Mark a campaign as finished."""
+        now = datetime.now(timezone.utc)
+        result = await self.campaigns.update_one(
+            {"cid": cid, "owner": owner},
+            {"$set": {
+                "status": CampaignStatus.Completed.value,
+                "owner": None,
+                "leaseUntil": None,
+                "completedAt": now,
+                "updatedAt": now,
+            }},
+        )
+        return result.modified_count > 0
+
+    async def _claim_recipients(self, cid: str, uids: list[str]) -> set[str]:
+        """
+        Record an intent to send to each recipient before sending.
+
+        The unique (cid, uid) index makes each claim succeed once, so a
+        recipient claimed by an earlier (possibly crashed) run is never
+        sent to again.
+        """
+        if not uids:
+            return set()
+        now = datetime.now(timezone.utc)
+        documents = [{"cid": cid, "uid": uid, "status": CLAIMED, "createdAt": now} for uid in uids]
+        try:
+            await self.deliveries.insert_many(documents, ordered=False)
+            return set(uids)
+        except BulkWriteError as e:
+            duplicates = {uids[error["index"]] for error in e.details.get("writeErrors", []) if error.get("code") == 11000}
+            others = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            if others:
+                raise
+            return set(uids) - duplicates
+
+    async def _requeue_claims(self, cid: str) -> int:
+        """
+        Drop claims an earlier lease holder never resolved so their recipients are claimed again.
+
+        Call only while holding the lease. Claims are only written for
+        recipients after the last checkpoint, so the resumed cursor streams
+        them again; copies that reached the outbox before the interruption
+        carry the same dedupe key and are not queued a second time.
+        """
+        result = await self.deliveries.delete_many({"cid": cid, "status": CLAIMED})
+        return result.deleted_count
+
+    async def _record_deliveries(self, cid: str, uids: list[str], status: str, error: Optional[str] = None):
+        """Flag claimed recipients as queued, sent or failed."""
+        if not uids:
+            return
+        update = {"status": status, "updatedAt": datetime.now(timezone.utc)}
+        if error is not None:
+            update["lastError"] = error
+        await self.deliveries.update_many({"cid": cid, "uid": {"$in": uids}}, {"$set": update})
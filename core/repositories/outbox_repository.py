@@ -0,0 +1,117 @@
+import uuid
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+class OutboxRepository:
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def _enqueue(self, messages: list[dict], keys: Optional[list[str]] = None) -> list:
+        """
+        Persist rendered messages in a single write, ready for delivery.
+
+        With `keys`, each message carries a dedupe key (unique index), and
+        a message whose key is already in the outbox is skipped, so the
+        same copy is never queued twice.
+        """
+        now = datetime.now(timezone.utc)
+        documents = [
+            {
+                "message": message,
+                "status": PENDING,
+                "attempts": 0,
+                "nextAttemptAt": now,
+                "leaseUntil": None,
+                "leaseId": None,
+                "lastError": None,
+                "createdAt": now,
+                "updatedAt": now,
+            }
+            for message in messages
+        ]
+        if keys is None:
+            result = await self.collection.insert_many(documents, ordered=True)
+            return result.inserted_ids
+        for document, key in zip(documents, keys, strict=True):
+            document["dedupeKey"] = key
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+            return [document["_id"] for document in documents]
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            duplicates = {error["index"] for error in errors}
+            return [document["_id"] for index, document in enumerate(documents) if index not in duplicates]
+
+    async def _claim(self, lease: timedelta) -> Optional[dict]:
+        """
+        Lease the next due message for delivery.
+
+        Messages left in `sending` by a crashed worker are reclaimed once
+        their lease runs out, so every message is delivered at least once.
+        Each lease gets a fresh `leaseId`, which the outcome writes must
+        present, so a worker whose lease expired cannot overwrite the
+        outcome of the worker that re-leased the message.
+        """
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": PENDING, "nextAttemptAt": {"$lte": now}},
+                    {"status": SENDING, "leaseUntil": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {"status": SENDING, "leaseUntil": now + lease, "leaseId": uuid.uuid4().hex, "updatedAt": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("nextAttemptAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _mark_sent(self, message_id, lease_id: str) -> bool:
+        """Flag a leased message as delivered; False if the lease was lost."""
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_one(
+            {"_id": message_id, "status": SENDING, "leaseId": lease_id},
+            {"$set": {"status": SENT, "leaseUntil": None, "leaseId": None, "sentAt": now, "updatedAt": now}},
+        )
+        return result.modified_count > 0
+
+    async def _mark_retry(self, message_id, lease_id: str, error: str, retry_at: datetime) -> bool:
+        """Release a leased message back to the queue for another attempt."""
+        result = await self.collection.update_one(
+            {"_id": message_id, "status": SENDING, "leaseId": lease_id},
+            {"$set": {
+                "status": PENDING,
+                "leaseUntil": None,
+                "leaseId": None,
+                "nextAttemptAt": retry_at,
+                "lastError": error,
+                "updatedAt": datetime.now(timezone.utc),
+            }},
+        )
+        return result.modified_count > 0
+
+    async def _mark_failed(self, message_id, lease_id: str, error: str) -> bool:
+        """Park a message that ran out of attempts."""
+        result = await self.collection.update_one(
+            {"_id": message_id, "status": SENDING, "leaseId": lease_id},
+            {"$set": {
+                "status": FAILED,
+                "leaseUntil": None,
+                "leaseId": None,
+                "lastError": error,
+                "updatedAt": datetime.now(timezone.utc),
+            }},
+        )
+        return result.modified_count > 0
@@ -1,48 +1,181 @@
-from motor.motor_asyncio import AsyncIOMotorCollection
-from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorCursor
+from typing import Iterable, Optional
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
-from core.base.models import User
+from core.base.models import (
+    User,
+    EmailPreferences,
+    UserWriteResult,
+    WriteOutcome,
+    RegistrationResult,
+    RegistrationOutcome,
+)
+from core.utils.str import random_id
+from core.utils.metrics import MONGO_LATENCY
+from core.utils.tracing import tracer
 from datetime import datetime, timezone
 
+def _projection(fields: Iterable[str]) -> dict:
+    """Mongo projection for `fields`; the UID is always included"""
+    return {"_id": 0, "uid": 1, **{field: 1 for field in fields}}
+
+def _trusted_user(document: dict) -> User:
+    """
+    Build a User from a document this service wrote, skipping validation.
+
+    Documents are validated on the way in, so reads can use `model_construct`
+    instead of re-parsing every field (EmailStr included). Fields outside the
+    projection keep their model defaults: callers must only use the fields
+    they asked for, which `model_fields_set` lists.
+    """
+    preferences = document.get("preferences")
+    if preferences is not None:
+        document["preferences"] = EmailPreferences.model_construct(**preferences)
+    return User.model_construct(**document)
+
 class UserRepository:
     def __init__(self, collection: AsyncIOMotorCollection):
         self.collection = collection
 
+    @tracer.traced("mongo.users.insert_one")
+    @MONGO_LATENCY.time("users.insert_one")
     async def _create_user(self, user: User) -> User:
         """Insert a new user into the database."""
         try:
             user_dict = user.model_dump()
             _ = await self.collection.insert_one(user_dict)
             
-            # user.uid = str(result.inserted_id)
-            return await self._get_user_by_email(user.email)
+            # The inserted document is exactly the model, so no read-back is needed
+            return user
         except DuplicateKeyError:
             raise ValueError("A user with that email already exists")
 
-    async def _get_user_by_email(self, email: str) -> Optional[User]:
-        """Retrieve a user by email."""
+    @tracer.traced("mongo.users.register_upsert")
+    @MONGO_LATENCY.time("users.register_upsert")
+    async def _register_user(self, user: User, attempts: int = 3) -> RegistrationResult:
+        """
+        Insert a new user, or resubscribe an existing one, in one atomic upsert.
+
+        The pre-image decides the outcome: none means the user was created,
+        default preferences mean they were already subscribed, anything else
+        means they have just been resubscribed. Concurrent signups for the
+        same address race on the unique email index; the loser retries and
+        matches the winner's document.
+        """
+        defaults = EmailPreferences().model_dump()
+        for attempt in range(attempts):
+            now = datetime.now(timezone.utc)
+            user_dict = user.model_dump()
+            insert_only = {
+                field: value for field, value in user_dict.items()
+                if field not in ("email", "preferences", "updatedAt")
+            }
+            try:
+                before = await self.collection.find_one_and_update(
+                    {"email": user.email},
+                    {
+                        "$setOnInsert": insert_only,
+                        "$set": {"preferences": defaults, "updatedAt": now},
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE,
+                )
+            except DuplicateKeyError:
+                if attempt == attempts - 1:
+                    raise
+                # Lost an insert race on email, or drew a UID that is taken
+                user = user.model_copy(update={"uid": random_id()})
+                continue
+            
+            if before is None:
+                return RegistrationResult(
+                    outcome=RegistrationOutcome.Created,
+                    user=User(**{**user_dict, "preferences": defaults, "updatedAt": now}),
+                )
+            outcome = (
+                RegistrationOutcome.AlreadySubscribed
+                if before.get("preferences") == defaults
+                else RegistrationOutcome.Resubscribed
+            )
+            return RegistrationResult(
+                outcome=outcome,
+                user=User(**{**before, "preferences": defaults, "updatedAt": now}),
+            )
+
+    @tracer.traced("mongo.users.find_by_email")
+    @MONGO_LATENCY.time("users.find_by_email")
+    async def _get_user_by_email(self, email: str, fields: Optional[Iterable[str]] = None) -> Optional[User]:
+        """Retrieve a user by email; with `fields`, only those are read (see `_trusted_user`)."""
+        if fields is not None:
+            user_data = await self.collection.find_one({"email": email}, _projection(fields))
+            return _trusted_user(user_data) if user_data else None
         user_data = await self.collection.find_one({"email": email})
         if user_data:
             return User(**user_data)
         return None
 
-    async def _get_user_by_uid(self, uid: str) -> Optional[User]:
-        """Retrieve a user by UID."""
+    @tracer.traced("mongo.users.find_by_uid")
+    @MONGO_LATENCY.time("users.find_by_uid")
+    async def _get_user_by_uid(self, uid: str, fields: Optional[Iterable[str]] = None) -> Optional[User]:
+        """Retrieve a user by UID; with `fields`, only those are read (see `_trusted_user`)."""
+        if fields is not None:
+            user_data = await self.collection.find_one({"uid": uid}, _projection(fields))
+            return _trusted_user(user_data) if user_data else None
         user_data = await self.collection.find_one({"uid": uid})
         if user_data:
             return User(**user_data)
         return None
 
-    async def _update_user(self, uid: str, update_data: dict) -> Optional[User]:
-        """Update user details by UID."""
-        update_data["updatedAt"] = datetime.now(timezone.utc)
-        result = await self.collection.update_one(
-            {"uid": uid}, {"$set": update_data}
+    @tracer.traced("mongo.users.update")
+    @MONGO_LATENCY.time("users.update")
+    async def _update_user(self, uid: str, update_data: dict) -> UserWriteResult:
+        """
+        Update user details by UID in one atomic round trip.
+
+        The pre-image comes back from `find_one_and_update`; since every
+        write is a top-level `$set`, the post-image is the pre-image with
+        the update applied, and comparing the two tells an idempotent
+        no-op apart from a missing user.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            before = await self.collection.find_one_and_update(
+                {"uid": uid},
+                {"$set": {**update_data, "updatedAt": now}},
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            raise ValueError("A user with that email already exists")
+        if before is None:
+            return UserWriteResult(outcome=WriteOutcome.NotFound)
+        
+        changed = [field for field, value in update_data.items() if before.get(field) != value]
+        after = {**before, **update_data, "updatedAt": now}
+        return UserWriteResult(
+            outcome=WriteOutcome.Updated if changed else WriteOutcome.Unchanged,
+            user=User(**after),
+            changed=changed,
+        )
+
+    def _stream_subscribers(self, preference: str, after_uid: Optional[str] = None, batch_size: int = 500) -> AsyncIOMotorCursor:
+        """
+        Cursor over verified users opted in to `preference`, ordered by UID.
+
+        Only the fields needed to address an email are fetched, and
+        `after_uid` resumes the stream from a checkpoint.
+        """
+        query = {f"preferences.{preference}": True, "emailVerified": True}
+        if after_uid:
+            query["uid"] = {"$gt": after_uid}
+        return self.collection.find(
+            query,
+            {"_id": 0, "uid": 1, "email": 1, "name": 1},
+            sort=[("uid", 1)],
+            batch_size=batch_size,
         )
-        if result.modified_count > 0:
-            return await self._get_user_by_uid(uid)
-        return None
 
+    @tracer.traced("mongo.users.delete_one")
+    @MONGO_LATENCY.time("users.delete_one")
     async def _delete_user(self, uid: str) -> bool:
         """Delete a user by UID."""
         result = await self.collection.delete_one({"uid": uid})
@@ -0,0 +1,55 @@
+import logging
+import asyncio
+from typing import Optional
+from core.repositories.analytics_repository import AnalyticsRepository
+from core.utils.analytics import AnalyticsAggregator
+from core.handlers.env_handler import env
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsService:
+    """
+    Flushes the request aggregator's rollups to Mongo once per window.
+
+    Requests only touch the in-memory aggregator; this background task
+    does the one batched write per window, off the request path. A failed
+    flush drops that window (logged) rather than letting memory grow.
+    """
+    def __init__(self, repository: AnalyticsRepository, aggregator: AnalyticsAggregator, window: float = 60.0):
+        self.repository = repository
+        self.aggregator = aggregator
+        self.window = window
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the flush loop on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and persist the partial window."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        rollups = self.aggregator.rollover()
+        try:
+            return await self.repository._insert_rollups(rollups)
+        except Exception as e:
+            logger.warning("Analytics flush failed, dropping %d rollups: %s", len(rollups), e)
+            return 0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
+
+def new_analytics_service(repository: AnalyticsRepository, aggregator: AnalyticsAggregator) -> AnalyticsService:
+    """AnalyticsService factory"""
+    return AnalyticsService(repository, aggregator, window=env.analytics["window"])
@@ -0,0 +1,290 @@
+import logging
+import asyncio
+import random
+import string
+import uuid
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from jinja2 import TemplateNotFound
+from core.base.models import Campaign, CampaignKind, CampaignStatus
+from core.base.exception import ServiceLevelError
+from core.repositories.campaign_repository import CampaignRepository, QUEUED, FAILED
+from core.repositories.user_repository import UserRepository
+from core.services.email_service import EmailService
+from core.services.outbox_service import OutboxService
+from core.services.token_service import TokenService, TokenPermission
+from core.utils.throttle import TokenBucket
+from core.handlers.env_handler import env
+from content.email_content import product_banners, newsletter, marketing_banners
+
+logger = logging.getLogger(__name__)
+
+default_banners = {
+    CampaignKind.Product.value: product_banners,
+    CampaignKind.Content.value: newsletter,
+    CampaignKind.Marketing.value: marketing_banners,
+}
+
+def _lease_remaining(campaign: Campaign) -> float:
+    """Seconds until another worker's lease on the campaign runs out (0 if it is free)."""
+    if campaign.owner is None or campaign.leaseUntil is None:
+        return 0.0
+    lease_until = campaign.leaseUntil
+    if lease_until.tzinfo is None:
+        # Mongo hands datetimes back naive, in UTC
+        lease_until = lease_until.replace(tzinfo=timezone.utc)
+    return max(0.0, (lease_until - datetime.now(timezone.utc)).total_seconds())
+
+def _placeholders(text: str) -> set[str]:
+    """`"What's new in v{version}"` -> {"version"}"""
+    return {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+
+def _banner(kind: CampaignKind, banner_text: Optional[str], variables: dict) -> str:
+    """The campaign's banner with its placeholders filled from `variables`"""
+    if banner_text is None:
+        # Only default banners whose placeholders the campaign can fill
+        banner_text = random.choice([
+            banner for banner in default_banners[kind.value]
+            if _placeholders(banner) <= variables.keys()
+        ])
+    try:
+        missing = _placeholders(banner_text) - variables.keys()
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Banner text needs campaign variables: {', '.join(sorted(missing))}",
+            )
+        return banner_text.format(**variables)
+    except (IndexError, KeyError, ValueError, AttributeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid banner text: {e}")
+
+class CampaignService:
+    """
+    Subscriber broadcast engine.
+
+    Streams opted-in, verified users from a cursor in UID order and hands
+    each rendered copy to the outbox, which delivers it with retries and
+    backoff. Each recipient is claimed before queueing and progress is
+    checkpointed after every batch, so a crashed run resumes where it
+    stopped. The worker that takes over the lease releases every claim
+    the previous run left unresolved, and each copy is queued under a
+    per-recipient dedupe key, so recipients whose copy already reached
+    the outbox are not sent to twice. A lease on the campaign keeps
+    concurrent workers from running the same campaign twice.
+
+    The campaign's `sent` counter counts copies queued for delivery.
+    """
+    def __init__(self,
+        repository: CampaignRepository,
+        user_repository: UserRepository,
+        email_service: EmailService,
+        token_service: TokenService,
+        outbox: OutboxService,
+        batch_size: int = 200,
+        chunk_size: int = 50,
+        rate: float = 50.0,
+        lease: timedelta = timedelta(minutes=5),
+    ):
+        self.repository = repository
+        self.user_repository = user_repository
+        self.email_service = email_service
+        self.token_service = token_service
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.chunk_size = max(1, chunk_size)
+        self.throttle = TokenBucket(rate)
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def create_campaign(self,
+        kind: CampaignKind,
+        subject: str,
+        template: str = "product-email.html",
+        banner_text: Optional[str] = None,
+        variables: Optional[dict] = None,
+    ) -> Campaign:
+        """Create a campaign and start sending it in the background."""
+        try:
+            self.email_service.templates.get(template)
+        except TemplateNotFound:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown template: {template}")
+        kind = CampaignKind(kind)
+        variables = variables or {}
+        campaign = Campaign(
+            kind=kind,
+            subject=subject,
+            template=template,
+            bannerText=_banner(kind, banner_text, variables),
+            variables=variables,
+        )
+        campaign = await self.repository._create_campaign(campaign)
+        self.start(campaign.cid)
+        return campaign
+
+    async def get_campaign(self, cid: str) -> Campaign:
+        """Get a campaign and its progress counters."""
+        campaign = await self.repository._get_campaign(cid)
+        if not campaign:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Campaign not found.")
+        return campaign
+
+    def start(self, cid: str):
+        """Run (or resume) a campaign in the background unless it is already running here."""
+        task = self._tasks.get(cid)
+        if task is None or task.done():
+            task = asyncio.create_task(self._run(cid))
+            self._tasks[cid] = task
+            task.add_done_callback(lambda _: self._tasks.pop(cid, None))
+
+    async def resume(self, cid: str) -> Campaign:
+        """Resume a campaign here, unless another live worker is sending it."""
+        campaign = await self.get_campaign(cid)
+        if (
+            campaign.status == CampaignStatus.Running.value
+            and campaign.owner != self.owner
+            and _lease_remaining(campaign) > 0
+        ):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Campaign is being sent by another worker.")
+        self.start(campaign.cid)
+        return campaign
+
+    async def resume_incomplete(self):
+        """Resume every campaign left running by a previous process."""
+        for cid in await self.repository._running_campaign_ids():
+            self.start(cid)
+
+    async def stop(self):
+        """Cancel running sends; their checkpoints let them resume on next start."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, cid: str):
+        """Send a campaign from its last checkpoint to the end of the list."""
+        campaign = await self._acquire(cid)
+        if campaign is None:
+            return
+        try:
+            requeued = await self.repository._requeue_claims(cid)
+            if requeued:
+                logger.warning("Campaign [%s] requeued %d recipients claimed by an interrupted run", cid, requeued)
+            cursor = self.user_repository._stream_subscribers(
+                campaign.kind,
+                after_uid=campaign.lastUid,
+                batch_size=self.batch_size,
+            )
+            batch = []
+            async for recipient in cursor:
+                batch.append(recipient)
+                if len(batch) >= self.batch_size:
+                    await self._send_batch(campaign, batch)
+                    batch = []
+            if batch:
+                await self._send_batch(campaign, batch)
+            await self.repository._complete_campaign(cid, self.owner)
+            logger.info("Campaign [%s] completed", cid)
+        except asyncio.CancelledError:
+            await self.repository._release_campaign(cid, self.owner)
+            raise
+        except Exception as e:
+            logger.error("Campaign [%s] stopped: %s", cid, e)
+            await self.repository._release_campaign(cid, self.owner)
+
+    async def _acquire(self, cid: str) -> Optional[Campaign]:
+        """
+        Lease a campaign, waiting out a lease held by another worker.
+
+        A worker that died mid-send keeps its lease until it expires, so
+        retry then rather than leaving the campaign stuck until the next
+        restart. None once the campaign is finished.
+        """
+        while True:
+            campaign = await self.repository._lease_campaign(cid, self.owner, self.lease)
+            if campaign is not None:
+                return campaign
+            current = await self.repository._get_campaign(cid)
+            if current is None or current.status != CampaignStatus.Running.value:
+                return None
+            wait = max(1.0, _lease_remaining(current))
+            logger.info("Campaign [%s] is leased by another worker, retrying in %.0fs", cid, wait)
+            await asyncio.sleep(wait)
+
+    async def _send_batch(self, campaign: Campaign, batch: list[dict]):
+        """Claim, render and queue one batch, then checkpoint it."""
+        uids = [recipient["uid"] for recipient in batch]
+        claimed = await self.repository._claim_recipients(campaign.cid, uids)
+        recipients = [recipient for recipient in batch if recipient["uid"] in claimed]
+        
+        # Render on the pool and queue the copies a chunk at a time, paced by the token bucket
+        tokens = await asyncio.gather(*[
+            self.token_service.generate_reach_token(uid=recipient["uid"], permission=TokenPermission.ChangePreferences)
+            for recipient in recipients
+        ])
+        queued: list[str] = []
+        failed: list[str] = []
+        chunk: list[tuple[str, dict]] = []
+        render_error = None
+        try:
+            async for index, message in self.email_service.build_campaign_emails(campaign, recipients, tokens):
+                await self.throttle.acquire()
+                chunk.append((recipients[index]["uid"], message))
+                if len(chunk) >= self.chunk_size:
+                    await self._queue_chunk(campaign.cid, chunk, queued, failed)
+                    chunk = []
+        except Exception as e:
+            render_error = f"Render failed: {e}"
+        if chunk:
+            await self._queue_chunk(campaign.cid, chunk, queued, failed)
+        if render_error is not None:
+            unrendered = [uid for uid in claimed if uid not in set(queued) | set(failed)]
+            await self.repository._record_deliveries(campaign.cid, unrendered, FAILED, render_error)
+            failed.extend(unrendered)
+        
+        checkpoint = await self.repository._checkpoint(
+            campaign.cid,
+            self.owner,
+            self.lease,
+            last_uid=uids[-1],
+            sent=len(queued),
+            failed=len(failed),
+            skipped=len(batch) - len(recipients),
+        )
+        if checkpoint is None:
+            raise ServiceLevelError(message=f"Lost lease on campaign {campaign.cid}")
+
+    async def _queue_chunk(self, cid: str, chunk: list[tuple[str, dict]], queued: list[str], failed: list[str]):
+        """Queue a chunk of rendered copies in one outbox write and record the outcome in one update."""
+        uids = [uid for uid, _ in chunk]
+        try:
+            await self.outbox.enqueue(
+                *[message for _, message in chunk],
+                keys=[f"campaign:{cid}:{uid}" for uid in uids],
+            )
+        except Exception as e:
+            await self.repository._record_deliveries(cid, uids, FAILED, str(e))
+            failed.extend(uids)
+        else:
+            await self.repository._record_deliveries(cid, uids, QUEUED)
+            queued.extend(uids)
+
+def new_campaign_service(
+    repository: CampaignRepository,
+    user_repository: UserRepository,
+    email_service: EmailService,
+    token_service: TokenService,
+    outbox: OutboxService,
+) -> CampaignService:
+    """CampaignService factory"""
+    return CampaignService(
+        repository,
+        user_repository,
+        email_service,
+        token_service,
+        outbox,
+        batch_size=env.campaign["batch_size"],
+        chunk_size=env.campaign["chunk_size"],
+        rate=env.campaign["rate"],
+    )
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from core.base.exception import EmailDeliveryError
+
+class EmailBatcher:
+    """
+    Coalesce individual sends into multi-message provider calls.
+
+    Messages submitted within `max_wait` seconds of each other (or until
+    `max_batch_size` is reached) are flushed together through `send_batch`,
+    which must return one status dict per message in submission order.
+    Each caller awaits only the status of its own message.
+    """
+    def __init__(self,
+        send_batch: Callable[[list[dict]], Awaitable[list[dict]]],
+        max_batch_size: int = 50,
+        max_wait: float = 0.05,
+    ):
+        self.send_batch = send_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: set[asyncio.Task] = set()
+
+    async def submit(self, message: dict) -> dict:
+        """Queue a message for the next batch and wait for its own result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def close(self):
+        """Flush anything still queued and wait for outstanding batches."""
+        self._flush()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def _flush(self):
+        """Hand the queued messages to a send task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._send(batch))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _send(self, batch: list[tuple[dict, asyncio.Future]]):
+        """Send one batch and resolve each caller's future from its message status."""
+        try:
+            results = await self.send_batch([message for message, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results or []):
+            if future.done():
+                continue
+            if not isinstance(result, dict):
+                future.set_exception(EmailDeliveryError(message=f"Invalid message status: {result!r}"))
+            elif result.get("Status") == "success":
+                future.set_result(result)
+            else:
+                future.set_exception(EmailDeliveryError(message=str(result.get("Errors") or result)))
+        
+        # A short or missing status list must not leave callers waiting forever
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(EmailDeliveryError(message="No status returned for message"))
@@ -1,31 +1,247 @@
-from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from typing import Optional
-from mailjet_rest import Client
-import asyncio
-from functools import partial
+import logging
+from typing import AsyncIterator, Optional
 from core.services.token_service import TokenService
 from core.handlers.env_handler import env
+from core.clients.email_transport import EmailTransport
+from core.services.email_batcher import EmailBatcher
+from core.base.models import Campaign
+from core.utils.tracing import tracer
+from core.utils.template_registry import TemplateRegistry, template_registry
+from core.utils.render_pool import RenderPool
+from core.utils.email_compiler import normalize_text
+from core.utils.metrics import EMAIL_SEND_LATENCY, EMAIL_MESSAGES
+import time
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = env.state["base_url"]
 SENDER_EMAIL = env.state["sender"]
-MAILJET_API_KEY = env.mailjet["api_key"]
-MAILJET_SECRET_KEY = env.mailjet["secret_key"]
+EMAIL_BATCH_SIZE = env.email["batch_size"]
+EMAIL_BATCH_WINDOW = env.email["batch_window"]
 
 NODE_ENV = env.state["node_env"]
 CLIENT_LOCAL = env.state["client_local"]
 CLIENT_PROD = env.state["client_prod"]
 TEMPLATE_BASE = CLIENT_PROD if NODE_ENV == "production" else CLIENT_LOCAL
 
+# Plain-text parts, dedented once here rather than sent with source indentation
+WELCOME_TEXT = normalize_text("""
+    Hello {name},
+
+    Thanks for joining this indie dev journey!
+
+    You can updated your email preferences at:
+    {preferences_url}
+
+    If you have any questions, just reply to this email.
+
+    Best regards,
+    Alex
+""")
+UNSUBSCRIBE_TEXT = normalize_text("""
+    Hello {name},
+
+    This email confirms that you have been unsubscribed from Devarno.com updates and notifications.
+
+    If you unsubscribed by mistake, you can resubscribe at:
+    {preferences_url}
+
+    Best regards,
+    The Team
+""")
+VERIFY_TEXT = normalize_text("""
+    Hi {name},
+
+    Thank you for signing up with Devarno! Please verify your email address by clicking the link below:
+
+    {verification_url}
+
+    If you didn’t sign up, you can safely ignore this email.
+
+    Cheers,
+    Alex
+""")
+CAMPAIGN_TEXT = normalize_text("""
+    Hey {name},
+
+    {banner_text}
+
+    Read the full update in your inbox's HTML view.
+
+    You can update your email preferences at:
+    {preferences_url}
+""")
+
 
 class EmailService(TokenService):
-    def __init__(self):
-        self.mailjet = Client(auth=(MAILJET_API_KEY, MAILJET_SECRET_KEY), version='v3.1')
-        self.env = Environment(
-            loader=FileSystemLoader(Path("templates")),
-            autoescape=select_autoescape(["html"])
+    def __init__(self,
+        transport: EmailTransport,
+        templates: TemplateRegistry = template_registry,
+        renderer: Optional[RenderPool] = None,
+    ):
+        self.transport = transport
+        self.templates = templates
+        self.renderer = renderer or RenderPool(templates)
+        self.batcher = EmailBatcher(
+            self._send_batch,
+            max_batch_size=min(EMAIL_BATCH_SIZE, self.transport.max_batch_size),
+            max_wait=EMAIL_BATCH_WINDOW,
         )
 
+    async def build_welcome_email(self,
+        email: str,
+        preferences_token: str,
+        name: Optional[str] = None,
+    ) -> dict:
+        """Render the welcome email into a Mailjet message"""
+        # Load template
+        preferences_url = f"{TEMPLATE_BASE}/preferences/{preferences_token}"
+        unsubscribe_url = f"{TEMPLATE_BASE}/unsubscribe/{preferences_token}"
+
+        # Prepare template variables
+        template_vars = {
+            "name": name or email,
+            "base_url": BASE_URL,
+            "banner_text": "Welcome to the journey",
+            "preferences_url": preferences_url,
+            "unsubscribe_url": unsubscribe_url,
+        }
+
+        # Render template
+        html_content = await self._render("welcome-email.html", template_vars)
+        return {
+            "From": {"Email": SENDER_EMAIL, "Name": "Devarno"},
+            "To": [{"Email": email, "Name": name or email}],
+            "Subject": "Welcome to the journey",
+            "HTMLPart": html_content,
+            "TextPart": WELCOME_TEXT.format(name=name or "there", preferences_url=preferences_url),
+        }
+
+    async def build_unsubscribe_confirmation_email(self,
+        email: str,
+        preferences_token: str,
+        name: Optional[str] = None,
+    ) -> dict:
+        """Render the unsubscribe confirmation email into a Mailjet message"""
+        preferences_url = f"{TEMPLATE_BASE}/preferences/{preferences_token}"
+        template_vars = {    
+            "name": name or email,
+            "base_url": BASE_URL,                
+            "banner_text": "See you again soon",
+            "preferences_url": preferences_url,
+        }
+        html_content = await self._render("unsubscribe-email.html", template_vars)
+        return {
+            "From": {
+                "Email": SENDER_EMAIL,
+                "Name": "Devarno"
+            },
+            "To": [{"Email": email, "Name":name}],
+            "Subject": "Unsubscribe Confirmation",
+            "HTMLPart": html_content,
+            "TextPart": UNSUBSCRIBE_TEXT.format(name=name, preferences_url=preferences_url),
+        }
+
+    async def build_verify_email(self,
+        email: str,
+        verification_token: str,
+        name: Optional[str] = None,
+    ) -> dict:
+        """Render the email verification link into a Mailjet message"""
+        verification_url = f"{TEMPLATE_BASE}/verify/{verification_token}"
+        template_vars = {
+            "name": name or email,
+            "base_url": BASE_URL,
+            "verification_url": verification_url,
+            "banner_text": "Verify Your Email Address",
+        }
+        html_content = await self._render("verify-email.html", template_vars)
+        return {
+            "From": {"Email": SENDER_EMAIL, "Name": "Devarno"},
+            "To": [{"Name": name or email, "Email": email}],
+            "Subject": "Verify Your Email Address",
+            "HTMLPart": html_content,
+            "TextPart": VERIFY_TEXT.format(name=name or "there", verification_url=verification_url),
+        }
+
+    async def build_campaign_email(self,
+        campaign: Campaign,
+        email: str,
+        preferences_token: str,
+        name: Optional[str] = None,
+    ) -> dict:
+        """Render one recipient's copy of a campaign into a message"""
+        html_content = await self._render(campaign.template, self._campaign_vars(campaign, email, preferences_token, name))
+        return self._campaign_message(campaign, email, preferences_token, name, html_content)
+
+    async def build_campaign_emails(self,
+        campaign: Campaign,
+        recipients: list[dict],
+        preferences_tokens: list[str],
+    ) -> AsyncIterator[tuple[int, dict]]:
+        """Render a batch of recipients' copies on the render pool, yielding `(index, message)` as each is ready"""
+        contexts = [
+            self._campaign_vars(campaign, recipient["email"], token, recipient.get("name"))
+            for recipient, token in zip(recipients, preferences_tokens)
+        ]
+        async for index, html_content in self.renderer.render_many(campaign.template, contexts):
+            recipient = recipients[index]
+            yield index, self._campaign_message(campaign, recipient["email"], preferences_tokens[index], recipient.get("name"), html_content)
+
+    def _campaign_vars(self, campaign: Campaign, email: str, preferences_token: str, name: Optional[str]) -> dict:
+        return {
+            **campaign.variables,
+            "name": name or email,
+            "base_url": BASE_URL,
+            "banner_text": campaign.bannerText or campaign.subject,
+            "preferences_url": f"{TEMPLATE_BASE}/preferences/{preferences_token}",
+            "unsubscribe_url": f"{TEMPLATE_BASE}/unsubscribe/{preferences_token}",
+        }
+
+    def _campaign_message(self, campaign: Campaign, email: str, preferences_token: str, name: Optional[str], html_content: str) -> dict:
+        preferences_url = f"{TEMPLATE_BASE}/preferences/{preferences_token}"
+        return {
+            "From": {"Email": SENDER_EMAIL, "Name": "Devarno"},
+            "To": [{"Email": email, "Name": name or email}],
+            "Subject": campaign.subject,
+            "HTMLPart": html_content,
+            "TextPart": CAMPAIGN_TEXT.format(
+                name=name or "there",
+                banner_text=campaign.bannerText or campaign.subject,
+                preferences_url=preferences_url,
+            ),
+        }
+
+    async def _render(self, template_name: str, template_vars: dict) -> str:
+        """Render a single message with the render pool (thread pool; bulk sends use build_campaign_emails)"""
+        with tracer.span("EmailService.render", template=template_name):
+            return await self.renderer.render(template_name, template_vars)
+
+    async def _send_batch(self, messages: list[dict]) -> list[dict]:
+        """Hand a batch to the transport, recording latency and per-message outcomes"""
+        transport = type(self.transport).__name__
+        start = time.perf_counter()
+        try:
+            with tracer.span("EmailTransport.send", transport=transport, messages=len(messages)):
+                statuses = await self.transport.send(messages)
+        except Exception:
+            EMAIL_MESSAGES.inc(transport, "error", amount=len(messages))
+            raise
+        finally:
+            EMAIL_SEND_LATENCY.observe(time.perf_counter() - start, transport)
+        for status in statuses:
+            EMAIL_MESSAGES.inc(transport, status.get("Status", "unknown"))
+        return statuses
+
+    @tracer.traced("EmailService.deliver")
+    async def deliver(self, message: dict) -> dict:
+        """Send a rendered message through the transport, raising if it is rejected"""
+        return await self.batcher.submit(message)
+
+    async def close(self):
+        """Flush any messages still waiting for a batch"""
+        await self.batcher.close()
+
     async def send_welcome_email(self,
         email: str,
         preferences_token: str,
@@ -33,54 +249,10 @@ class EmailService(TokenService):
     ):
         """Send welcome email using the template"""
         try:
-            # Load template
-            preferences_url = f"{TEMPLATE_BASE}/preferences/{preferences_token}"
-            unsubscribe_url = f"{TEMPLATE_BASE}/unsubscribe/{preferences_token}"
-            template = self.env.get_template("welcome-email.html")
-                        
-            # Prepare template variables
-            template_vars = {
-                "name": name or email,
-                "base_url": BASE_URL,
-                "banner_text": "Welcome to the journey",
-                "preferences_url": preferences_url,
-                "unsubscribe_url": unsubscribe_url,
-            }
-            
-            # Render template
-            html_content = template.render(**template_vars)
-            
-            # Prepare email data
-            data = {
-                'Messages': [{
-                    "From": {"Email": SENDER_EMAIL, "Name": "Devarno"},
-                    "To": [{"Email": email, "Name": name or email}],
-                    "Subject": "Welcome to the journey",
-                    "HTMLPart": html_content,
-                    "TextPart": f"""
-                    Hello {name or 'there'},
-
-                    Thanks for joining this indie dev journey!
-                    
-                    You can updated your email preferences at:
-                    {preferences_url}
-                    
-                    If you have any questions, just reply to this email.
-                    
-                    Best regards,
-                    Alex
-                    """
-                }]
-            }
-            
-            # Send email asynchronously
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, partial(self.mailjet.send.create, data=data))
-            return response
-            
+            message = await self.build_welcome_email(email, preferences_token, name)
+            return await self.deliver(message)
         except Exception as e:
-            print(f"Error sending welcome email: {str(e)}")
-            # You might want to log this error or handle it differently
+            logger.error("Error sending welcome email: %s", e)
             raise
         
     async def send_unsubscribe_confirmation_email(self,
@@ -90,48 +262,11 @@ class EmailService(TokenService):
     ):
         """Send unsubscribe confirmation email"""
         try:
-            preferences_url = f"{TEMPLATE_BASE}/preferences/{preferences_token}"
-            template = self.env.get_template("unsubscribe-email.html")
-            template_vars = {    
-                "name": name or email,
-                "base_url": BASE_URL,                
-                "banner_text": "See you again soon",
-                "preferences_url": preferences_url,
-            }
-            html_content = template.render(**template_vars)
-            data = {
-                'Messages': [
-                    {
-                        "From": {
-                            "Email": SENDER_EMAIL,
-                            "Name": "Devarno"
-                        },
-                        "To": [{"Email": email, "Name":name}],
-                        "Subject": "Unsubscribe Confirmation",
-                        "HTMLPart": html_content,
-                        "TextPart": f"""
-                            Hello {name},
-                            
-                            This email confirms that you have been unsubscribed from Devarno.com updates and notifications.
-                            
-                            If you unsubscribed by mistake, you can resubscribe at:
-                            {preferences_url}
-                            
-                            Best regards,
-                            The Team
-                        """
-                    }
-                ]
-            }
-            
-            # Send email asynchronously
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, partial(self.mailjet.send.create, data=data))
-            
+            message = await self.build_unsubscribe_confirmation_email(email, preferences_token, name)
+            await self.deliver(message)
         except Exception as e:
-            print(f"Error sending unsubscribe confirmation: {str(e)}")
-            # Log the error but don't raise - we don't want to break the unsubscribe flow
-            # Consider adding proper error logging here
+            # Don't raise - we don't want to break the unsubscribe flow
+            logger.error("Error sending unsubscribe confirmation: %s", e)
             
     async def send_verify_email(self, 
         email: str,
@@ -140,45 +275,12 @@ class EmailService(TokenService):
     ):
         """Send email verification link using the template"""
         try:
-            verification_url = f"{TEMPLATE_BASE}/verify/{verification_token}"
-            template = self.env.get_template("verify-email.html")
-            template_vars = {
-                "name": name or email,
-                "base_url": BASE_URL,
-                "verification_url": verification_url,
-                "banner_text": "Verify Your Email Address",
-            }
-            html_content = template.render(**template_vars)
-            data = {
-                'Messages': [{
-                    "From": {"Email": SENDER_EMAIL, "Name": "Devarno"},
-                    "To": [{"Name": name or email, "Email": email}],
-                    "Subject": "Verify Your Email Address",
-                    "HTMLPart": html_content,
-                    "TextPart": f"""
-                    Hi {name or 'there'},
-
-                    Thank you for signing up with Devarno! Please verify your email address by clicking the link below:
-
-                    {verification_url}
-
-                    If you didn’t sign up, you can safely ignore this email.
-
-                    Cheers,
-                    Alex
-                    """
-                }]
-            }
-            
-            # Send the email asynchronously
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, partial(self.mailjet.send.create, data=data))
-            
+            message = await self.build_verify_email(email, verification_token, name)
+            await self.deliver(message)
         except Exception as e:
-            print(f"Error sending verification email: {str(e)}")
-            # Log or handle the error as needed
+            logger.error("Error sending verification email: %s", e)
             raise
 
-def new_email_service() -> EmailService:
+def new_email_service(transport: EmailTransport, renderer: Optional[RenderPool] = None) -> EmailService:
     """EmailService factory"""
-    return EmailService()
\ No newline at end of file
+    return EmailService(transport, renderer=renderer)
@@ -0,0 +1,138 @@
+import logging
+import asyncio
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from core.repositories.outbox_repository import OutboxRepository
+from core.services.email_service import EmailService
+from core.base.exception import ServiceLevelError
+from core.handlers.env_handler import env
+from core.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class OutboxService:
+    """
+    Durable email outbox.
+
+    Request handlers enqueue rendered messages and return as soon as the
+    write lands; a background worker leases due messages and hands them to
+    the EmailService, retrying with exponential backoff.
+    """
+    def __init__(self,
+        repository: OutboxRepository,
+        email_service: EmailService,
+        concurrency: int = 4,
+        poll_interval: float = 5.0,
+        lease: timedelta = timedelta(minutes=2),
+        max_attempts: int = 8,
+        base_backoff: timedelta = timedelta(seconds=30),
+        max_backoff: timedelta = timedelta(hours=1),
+    ):
+        self.repository = repository
+        self.email_service = email_service
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight: set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @tracer.traced("OutboxService.enqueue")
+    async def enqueue(self, *messages: dict, keys: Optional[list[str]] = None) -> list:
+        """Store rendered messages for delivery and wake the worker; `keys` skips copies already queued."""
+        if not messages:
+            return []
+        try:
+            ids = await self.repository._enqueue(list(messages), keys)
+        except Exception as e:
+            raise ServiceLevelError(message={"enqueue": str(e)})
+        self._wakeup.set()
+        return ids
+
+    def start(self):
+        """Start the delivery worker on the running loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop claiming new messages and let in-flight deliveries finish."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _run(self):
+        """Claim due messages until none are left, then wait for a wakeup or the next poll."""
+        while True:
+            await self._slots.acquire()
+            try:
+                document = await self.repository._claim(self.lease)
+            except Exception as e:
+                self._slots.release()
+                logger.error("Outbox claim failed: %s", e)
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if document is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._deliver(document))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, document: dict):
+        """Send one leased message and record the outcome."""
+        with tracer.start_trace("outbox.deliver", attempts=document.get("attempts", 1)):
+            try:
+                await self.email_service.deliver(document["message"])
+            except Exception as e:
+                await self._handle_failure(document, str(e))
+            else:
+                try:
+                    if not await self.repository._mark_sent(document["_id"], document["leaseId"]):
+                        logger.warning("Outbox lease on %s expired before it was marked sent", document["_id"])
+                except Exception as e:
+                    # Lease expiry will redeliver it; duplicates are preferred over losses
+                    logger.error("Outbox could not mark %s as sent: %s", document["_id"], e)
+            finally:
+                self._slots.release()
+
+    async def _handle_failure(self, document: dict, error: str):
+        """Schedule a retry, or park the message once attempts are exhausted."""
+        attempts = document.get("attempts", 1)
+        try:
+            if attempts >= self.max_attempts:
+                logger.error("Outbox giving up on %s after %d attempts: %s", document["_id"], attempts, error)
+                await self.repository._mark_failed(document["_id"], document["leaseId"], error)
+                return
+            backoff = min(self.base_backoff * (2 ** (attempts - 1)), self.max_backoff)
+            retry_at = datetime.now(timezone.utc) + backoff
+            logger.warning("Outbox delivery failed (attempt %d), retrying in %s: %s", attempts, backoff, error)
+            await self.repository._mark_retry(document["_id"], document["leaseId"], error, retry_at)
+        except Exception as e:
+            logger.error("Outbox could not reschedule %s: %s", document["_id"], e)
+
+def new_outbox_service(repository: OutboxRepository, email_service: EmailService) -> OutboxService:
+    """OutboxService factory"""
+    return OutboxService(
+        repository,
+        email_service,
+        concurrency=env.outbox["concurrency"],
+        poll_interval=env.outbox["poll_interval"],
+        max_attempts=env.outbox["max_attempts"],
+    )
@@ -1,4 +1,6 @@
 import os
+import time
+import hashlib
 import jwt 
 from typing import Optional, Union
 from datetime import datetime, timedelta, timezone
@@ -6,19 +8,25 @@ from enum import Enum
 from fastapi.exceptions import HTTPException
 
 from core.base.exception import ServiceLevelError
+from core.utils.cache import TTLCache
+from core.utils.tracing import tracer
 
 class TokenPermission(Enum):
     ChangePreferences="change_preferences"
     VerifyEmail="verify_email"
 
 class TokenService:
-    def __init__(self, secret_key: str, algorithm: str):
+    def __init__(self, secret_key: str, algorithm: str, cache_size: int = 10_000):
         self.secret_key = secret_key
         self.algorithm = algorithm
         if not self.secret_key or not self.algorithm:
             raise ValueError("JWT_SECRET_KEY and ALGORITHM expected in .env")
         self.token_duration = timedelta(days=7)
+        
+        # Verified claims by token digest; each entry expires with its token
+        self.verified_cache = TTLCache(max_size=cache_size) if cache_size > 0 else None
     
+    @tracer.traced("TokenService.generate_reach_token")
     async def generate_reach_token(self, 
             uid: str,
             permission: TokenPermission,
@@ -45,13 +53,14 @@ class TokenService:
         except Exception as e:
             raise ServiceLevelError(message={"generate_reach_token": e})
                 
+    @tracer.traced("TokenService.verify_reach_token")
     async def verify_reach_token(self, 
         token: str, 
         permissions: list[TokenPermission],
     ) -> dict:
         """Verify token and required permissions."""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = self._decode(token)
             token_permission = payload.get("perm")
             if token_permission and token_permission in [perm.value for perm in permissions]:
                 return {
@@ -64,6 +73,27 @@ class TokenService:
         except jwt.InvalidTokenError:
             raise ServiceLevelError(message="Invalid token")
 
+    def _decode(self, token: str) -> dict:
+        """
+        Decode and verify a token, reusing claims already verified for it.
+
+        Only successfully verified tokens are cached, keyed by a SHA-256
+        digest rather than the token itself, and each entry is evicted at
+        the token's `exp`, so an expired token is always re-verified (and
+        rejected) by PyJWT.
+        """
+        if self.verified_cache is None:
+            return jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self.verified_cache.get(key)
+        if payload is not None:
+            return payload
+        payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            self.verified_cache.set(key, payload, ttl=ttl)
+        return payload
+
     
-def new_token_service(secret_key: str, algorithm: str) -> TokenService:
-    return TokenService(secret_key, algorithm)
\ No newline at end of file
+def new_token_service(secret_key: str, algorithm: str, cache_size: int = 10_000) -> TokenService:
+    return TokenService(secret_key, algorithm, cache_size)
\ No newline at end of file
@@ -0,0 +1,184 @@
+from typing import Optional
+from core.base.models import User
+from core.utils.cache import TTLCache
+from core.handlers.env_handler import env
+
+class LocalCacheBackend:
+    """
+    Per-process backend, for single-worker deployments, tests and local runs.
+
+    Invalidations only reach the process that made the write, so with
+    several workers the others serve their copy until it expires.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.generation = 0
+
+    async def get_user(self, key: str) -> Optional[User]:
+        return self.cache.get(key)
+
+    async def get_pointer(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    async def get_generation(self) -> int:
+        return self.generation
+
+    async def set_user(self, key: str, user: User, pointer_key: str, guard_key: str, generation: int) -> bool:
+        if self.cache.get(guard_key, 0) > generation:
+            return False
+        self.cache.set(key, user)
+        self.cache.set(pointer_key, user.uid)
+        return True
+
+    async def invalidate(self, key: str, guard_key: str):
+        self.generation += 1
+        self.cache.set(guard_key, self.generation)
+        self.cache.delete(key)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+# Store only if no invalidation of this user happened after the read began
+_SET_USER = """
+if tonumber(redis.call('GET', KEYS[3]) or '0') > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[4])
+redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[4])
+return 1
+"""
+
+_INVALIDATE = """
+local generation = redis.call('INCR', KEYS[1])
+redis.call('SET', KEYS[2], generation, 'PX', ARGV[1])
+redis.call('DEL', KEYS[3])
+return generation
+"""
+
+class RedisCacheBackend:
+    """Shared backend so every hypercorn worker sees the same entries and invalidations."""
+    def __init__(self, url: str, ttl: float, prefix: str = "reach:user:"):
+        import redis.asyncio as redis
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self.ttl_ms = max(1, int(ttl * 1000))
+        self.prefix = prefix
+        self._set_user = self.redis.register_script(_SET_USER)
+        self._invalidate = self.redis.register_script(_INVALIDATE)
+
+    async def get_user(self, key: str) -> Optional[User]:
+        data = await self.redis.get(self.prefix + key)
+        if data is None:
+            return None
+        return User.model_validate_json(data)
+
+    async def get_pointer(self, key: str) -> Optional[str]:
+        data = await self.redis.get(self.prefix + key)
+        return data.decode() if data is not None else None
+
+    async def get_generation(self) -> int:
+        return int(await self.redis.get(self.prefix + "generation") or 0)
+
+    async def set_user(self, key: str, user: User, pointer_key: str, guard_key: str, generation: int) -> bool:
+        stored = await self._set_user(
+            keys=[self.prefix + key, self.prefix + pointer_key, self.prefix + guard_key],
+            args=[user.model_dump_json(), user.uid, generation, self.ttl_ms],
+        )
+        return bool(stored)
+
+    async def invalidate(self, key: str, guard_key: str):
+        await self._invalidate(
+            keys=[self.prefix + "generation", self.prefix + guard_key, self.prefix + key],
+            args=[self.ttl_ms],
+        )
+
+    def stats(self) -> dict:
+        return {}
+
+    async def close(self):
+        await self.redis.aclose()
+
+class UserCache:
+    """
+    Read-through user cache keyed by UID and email.
+
+    Users are stored under their UID; the email key only points at the UID,
+    so invalidating the UID entry is enough to make every lookup path miss
+    after a write, even when the write changed the email address.
+
+    Each invalidation bumps a generation counter and stamps the user with
+    it. A reader takes the counter before going to the database, and its
+    `put` is dropped if the user was invalidated since, so a read that
+    raced a write cannot cache the pre-write document.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.stale_puts = 0
+
+    async def get(self, identifier: str) -> Optional[User]:
+        try:
+            if "@" in identifier:
+                uid = await self.backend.get_pointer(f"email:{identifier}")
+                user = await self.backend.get_user(f"uid:{uid}") if uid else None
+                if user is not None and user.email != identifier:
+                    user = None
+            else:
+                user = await self.backend.get_user(f"uid:{identifier}")
+        except Exception:
+            # A cache outage must never fail a read
+            self.errors += 1
+            user = None
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    async def generation(self) -> Optional[int]:
+        """Stamp to pass to `put`; take it before reading the user from the database."""
+        try:
+            return await self.backend.get_generation()
+        except Exception:
+            self.errors += 1
+            return None
+
+    async def put(self, user: User, generation: Optional[int]):
+        if generation is None:
+            return
+        try:
+            if not await self.backend.set_user(f"uid:{user.uid}", user, f"email:{user.email}", f"invalidated:{user.uid}", generation):
+                self.stale_puts += 1
+        except Exception:
+            self.errors += 1
+
+    async def invalidate(self, uid: str):
+        try:
+            await self.backend.invalidate(f"uid:{uid}", f"invalidated:{uid}")
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "stale_puts": self.stale_puts,
+            **{f"backend_{key}": value for key, value in self.backend.stats().items()},
+        }
+
+    async def close(self):
+        if hasattr(self.backend, "close"):
+            await self.backend.close()
+
+def new_user_cache() -> Optional[UserCache]:
+    """UserCache factory, selected by USER_CACHE_BACKEND (off|redis|local; local is single-worker only)"""
+    backend = env.cache["backend"]
+    if backend == "off":
+        return None
+    if backend == "redis":
+        return UserCache(RedisCacheBackend(env.redis["url"], ttl=env.cache["ttl"]))
+    if backend == "local":
+        return UserCache(LocalCacheBackend(max_size=env.cache["max_size"], ttl=env.cache["ttl"]))
+    raise ValueError(f"Unknown USER_CACHE_BACKEND: {backend}")
@@ -1,33 +1,61 @@
-from typing import Optional
+from typing import Iterable, Optional
 from fastapi import HTTPException, status
-from core.base.models import User, EmailPreferences
+from core.base.models import User, EmailPreferences, UserWriteResult, WriteOutcome, RegistrationResult
 from core.repositories.user_repository import UserRepository
+from core.services.user_cache import UserCache
 from core.base.exception import ServiceLevelError, DataNotFoundError
+from core.utils.tracing import tracer
 
 class UserService:
-    def __init__(self, repository: UserRepository):
+    def __init__(self, repository: UserRepository, cache: Optional[UserCache] = None):
         self.repository = repository
+        self.cache = cache
 
+    @tracer.traced("UserService.create_user")
     async def create_user(self, email: str, name: Optional[str] = None, source: Optional[str] = None) -> User:
-        """Create a new user."""
-        existing_user = await self.repository._get_user_by_email(email)
-        if existing_user:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User with this email already exists.")        
+        """Create a new user (the unique email index rejects duplicates)."""
         user = User(email=email, name=name, source=source)
-        return await self.repository._create_user(user)
+        try:
+            return await self.repository._create_user(user)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User with this email already exists.")
+    
+    @tracer.traced("UserService.register_user")
+    async def register_user(self, email: str, name: Optional[str] = None, source: Optional[str] = None) -> RegistrationResult:
+        """Create a user or resubscribe an existing one in a single database round trip."""
+        user = User(email=email, name=name, source=source)
+        try:
+            result = await self.repository._register_user(user)
+        except Exception as e:
+            raise ServiceLevelError(message={"register_user": str(e)})
+        await self._invalidate(result.user.uid)
+        return result
     
-    async def get_user(self, identifier: str) -> User:
+    @tracer.traced("UserService.get_user")
+    async def get_user(self, identifier: str, fields: Optional[Iterable[str]] = None) -> User:
         """
         Get a user by their email or UID.
         
         If the identifier contains an '@' symbol, it is treated as an email.
         Otherwise, it is treated as a UID.
+        
+        With `fields`, a cache miss reads only those fields without
+        validation, and the partial user is not cached.
         """
         try:
-            if "@" in identifier and len(identifier.split("@")) == 2:
-                user = await self.repository._get_user_by_email(identifier)
+            is_email = "@" in identifier and len(identifier.split("@")) == 2
+            generation = None
+            if self.cache is not None:
+                user = await self.cache.get(identifier)
+                if user is not None:
+                    return user
+                generation = await self.cache.generation()
+            if is_email:
+                user = await self.repository._get_user_by_email(identifier, fields)
             else:
-                user = await self.repository._get_user_by_uid(identifier)
+                user = await self.repository._get_user_by_uid(identifier, fields)
+            if user is not None and self.cache is not None and fields is None:
+                await self.cache.put(user, generation)
             return user
         except Exception as e:
             raise ServiceLevelError(message={"get_user": str(e)})
@@ -38,8 +66,8 @@ class UserService:
         name: Optional[str] = None,
         email: Optional[str] = None,
         preferences: Optional[dict] = None,
-    ) -> User:
-        """Update a user document."""
+    ) -> UserWriteResult:
+        """Update a user document; `changed` lists the fields that actually changed."""
         update_data = {}
         if name:
             update_data["name"] = name
@@ -47,12 +75,9 @@ class UserService:
             update_data["email"] = email
         if preferences:
             update_data["preferences"] = preferences
-        updated_user = await self.repository._update_user(uid, update_data)
-        if not updated_user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
-        return updated_user
+        return await self._write(uid, update_data)
 
-    async def unsubscribe_user(self, uid: str) -> User:
+    async def unsubscribe_user(self, uid: str) -> UserWriteResult:
         """Unsubscribe a user (set all email preferences to False)"""
         update_data = {
             "preferences": {
@@ -61,39 +86,47 @@ class UserService:
                 "content": False
             }
         }
-        user = await self.repository._update_user(uid, update_data)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, 
-                detail="User not found."
-            )
-        return user
+        return await self._write(uid, update_data)
     
-    async def resubscribe_user(self, uid: str) -> User:
+    async def resubscribe_user(self, uid: str) -> UserWriteResult:
         """Resubscribe a user (set all email preferences to default)."""
         update_data = {"preferences": EmailPreferences().model_dump()}
-        user = await self.repository._update_user(uid, update_data)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, 
-                detail="User not found."
-            )
-        return user
+        return await self._write(uid, update_data)
 
+    @tracer.traced("UserService.delete_user")
     async def delete_user(self, uid: str) -> bool:
         """Delete a user by UID."""
         user_deleted = await self.repository._delete_user(uid)
+        await self._invalidate(uid)
         if not user_deleted:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
         return True
     
-    async def confirm_email_verified(self, uid: str):
+    async def confirm_email_verified(self, uid: str) -> UserWriteResult:
         """Confirm user email address is verified successfully"""
-        return await self.repository._update_user(uid, {"emailVerified": True})
+        return await self._write(uid, {"emailVerified": True})
     
-    async def reset_email_verification(self, uid: str):
+    async def reset_email_verification(self, uid: str) -> UserWriteResult:
         """Flag user (new) email address as unverified"""
-        return await self.repository._update_user(uid, {"emailVerified": False})
+        return await self._write(uid, {"emailVerified": False})
+
+    @tracer.traced("UserService.write")
+    async def _write(self, uid: str, update_data: dict) -> UserWriteResult:
+        """Apply an update, treating only a missing user (not a no-op) as an error."""
+        try:
+            result = await self.repository._update_user(uid, update_data)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        finally:
+            await self._invalidate(uid)
+        if result.outcome == WriteOutcome.NotFound:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+        return result
+
+    async def _invalidate(self, uid: str):
+        """Drop a user's cached entry after any write"""
+        if self.cache is not None:
+            await self.cache.invalidate(uid)
         
-def new_user_service(repository: UserRepository) -> UserService:
-    return UserService(repository)
\ No newline at end of file
+def new_user_service(repository: UserRepository, cache: Optional[UserCache] = None) -> UserService:
+    return UserService(repository, cache)
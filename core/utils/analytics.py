@@ -0,0 +1,77 @@
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from core.handlers.env_handler import env
+
+# Latency bucket upper bounds (milliseconds); the last slot counts anything slower
+LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Slot layout of one series: count, total ms, max ms, then one count per bucket
+_COUNT, _TOTAL, _MAX, _BUCKETS = 0, 1, 2, 3
+
+class AnalyticsAggregator:
+    """
+    Per-route request rollups kept in fixed-size in-memory slots.
+
+    `record` is a dict lookup and a few list increments, with no I/O; the
+    current window is swapped out whole by `rollover` and persisted by
+    AnalyticsService. With sampling, counts are scaled back up by
+    1/sample_rate when rolled up. Series beyond `max_series` are folded
+    into a single "other" route so a path scan can't grow memory.
+    """
+    def __init__(self, sample_rate: float = 1.0, max_series: int = 1000):
+        self.sample_rate = sample_rate
+        self.max_series = max_series
+        self.window_start = datetime.now(timezone.utc)
+        self.series: dict[tuple, list] = {}
+
+    def record(self, method: str, route: str, status: int, duration_ms: float):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        key = (method, route, status)
+        slots = self.series.get(key)
+        if slots is None:
+            if len(self.series) >= self.max_series:
+                key = (method, "other", status)
+                slots = self.series.get(key)
+            if slots is None:
+                slots = self.series[key] = [0, 0.0, 0.0] + [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        slots[_COUNT] += 1
+        slots[_TOTAL] += duration_ms
+        if duration_ms > slots[_MAX]:
+            slots[_MAX] = duration_ms
+        slots[_BUCKETS + bisect_left(LATENCY_BOUNDS_MS, duration_ms)] += 1
+
+    def rollover(self) -> list[dict]:
+        """Close the current window and return its rollup documents"""
+        series, self.series = self.series, {}
+        window_start, self.window_start = self.window_start, datetime.now(timezone.utc)
+        weight = 1 / self.sample_rate if self.sample_rate > 0 else 1
+        rollups = []
+        for (method, route, status), slots in series.items():
+            rollups.append({
+                "windowStart": window_start,
+                "windowEnd": self.window_start,
+                "method": method,
+                "route": route,
+                "status": status,
+                "count": round(slots[_COUNT] * weight),
+                "sampled": slots[_COUNT],
+                "meanMs": round(slots[_TOTAL] / slots[_COUNT], 3),
+                "maxMs": round(slots[_MAX], 3),
+                "buckets": {
+                    ("inf" if index == len(LATENCY_BOUNDS_MS) else str(LATENCY_BOUNDS_MS[index])): round(count * weight)
+                    for index, count in enumerate(slots[_BUCKETS:]) if count
+                },
+            })
+        return rollups
+
+def new_analytics_aggregator() -> AnalyticsAggregator:
+    """Aggregator factory, configured by ANALYTICS_SAMPLE_RATE and ANALYTICS_MAX_SERIES"""
+    return AnalyticsAggregator(
+        sample_rate=env.analytics["sample_rate"],
+        max_series=env.analytics["max_series"],
+    )
+
+analytics = new_analytics_aggregator()
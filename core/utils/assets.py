@@ -0,0 +1,198 @@
+"""
+Static asset pipeline.
+
+    python -m core.utils.assets
+
+Optimises everything in `static/` into ASSET_OUTPUT under content-hashed
+names and writes a manifest mapping each source name to its hashed name.
+Hashed files are never overwritten, and every write goes through a
+uniquely named temporary file, so workers building at the same time
+cannot corrupt each other's output. The output directory does not survive
+a deploy; AssetFiles serves hashed names from earlier builds from the
+manifest's current entry.
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Optional
+from core.handlers.env_handler import env
+
+logger = logging.getLogger(__name__)
+
+# Longest side (px) per asset, at 2x the size the templates display them
+IMAGE_MAX_SIZES = {
+    "favicon.png": 64,
+    "social-*.png": 56,
+}
+# Shortest frame (ms) kept in animations; faster frames are merged into the one before
+ANIMATION_MIN_FRAME_MS = 80
+IMAGE_SUFFIXES = {".png", ".gif", ".jpg", ".jpeg"}
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+
+def _max_size(name: str) -> Optional[int]:
+    for pattern, size in IMAGE_MAX_SIZES.items():
+        if fnmatch(name, pattern):
+            return size
+    return None
+
+def _drop_frames(frames: list, durations: list[int], min_duration: int) -> tuple[list, list[int]]:
+    """Lower the frame rate of an animation without changing how long it plays"""
+    kept, kept_durations = [], []
+    for frame, duration in zip(frames, durations):
+        if kept and kept_durations[-1] < min_duration:
+            kept_durations[-1] += duration
+        else:
+            kept.append(frame)
+            kept_durations.append(duration)
+    return kept, kept_durations
+
+def _optimize_image(name: str, data: bytes) -> tuple[bytes, Optional[bytes]]:
+    """
+    Resize and recompress one image, keeping the original if that is smaller.
+    Animations are cut to at most 1000 / ANIMATION_MIN_FRAME_MS frames a
+    second, which is what shrinks them: their frames rarely share pixels,
+    so there is little left for the encoder to save. Also returns an (animated) WebP rendition when it beats the result.
+    """
+    from PIL import Image, ImageSequence
+
+    source = Image.open(io.BytesIO(data))
+    frames = [frame.copy() for frame in ImageSequence.Iterator(source)]
+    durations = [frame.info.get("duration", source.info.get("duration", 100)) for frame in frames]
+    animated = len(frames) > 1
+    if animated:
+        # Decoded GIF frames come back in mixed modes; a common one lets the encoder share work between them
+        frames = [frame.convert("RGBA") for frame in frames]
+        frames, durations = _drop_frames(frames, durations, ANIMATION_MIN_FRAME_MS)
+
+    max_size = _max_size(name)
+    if max_size and max(source.size) > max_size:
+        resized = []
+        for frame in frames:
+            frame = frame.convert("RGBA")
+            frame.thumbnail((max_size, max_size), Image.LANCZOS)
+            resized.append(frame)
+        frames = resized
+
+    output = io.BytesIO()
+    if source.format == "GIF":
+        frames[0].save(output, "GIF", save_all=animated, append_images=frames[1:], optimize=True, loop=source.info.get("loop", 0), duration=durations)
+    elif source.format == "PNG":
+        frames[0].save(output, "PNG", optimize=True)
+    else:
+        frames[0].convert("RGB").save(output, "JPEG", quality=85, optimize=True, progressive=True)
+    optimized = output.getvalue() if len(output.getvalue()) < len(data) else data
+
+    webp = io.BytesIO()
+    frames[0].save(webp, "WEBP", save_all=animated, append_images=frames[1:], loop=0, duration=durations, quality=80, method=6)
+    webp_data = webp.getvalue() if len(webp.getvalue()) < len(optimized) else None
+    return optimized, webp_data
+
+def _compressed_variants(data: bytes) -> dict[str, bytes]:
+    """gzip and brotli encodings, where they actually save bytes"""
+    import brotli
+
+    variants = {
+        ".gz": gzip.compress(data, compresslevel=9, mtime=0),
+        ".br": brotli.compress(data, quality=11),
+    }
+    return {suffix: encoded for suffix, encoded in variants.items() if len(encoded) < len(data)}
+
+def _replace(path: Path, data: bytes):
+    """Atomically write `path` via a temporary file no other writer shares"""
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def _write(path: Path, data: bytes):
+    if not path.exists():
+        _replace(path, data)
+
+def build_assets(source: str, output: str) -> dict[str, str]:
+    """Build every asset in `source` into `output` and return the manifest"""
+    source_dir, output_dir = Path(source), Path(output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for path in sorted(source_dir.iterdir()):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        data = path.read_bytes()
+        variants = {}
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            data, webp = _optimize_image(path.name, data)
+            if webp is not None:
+                variants[".webp"] = webp
+        elif path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            variants = _compressed_variants(data)
+
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = f"{path.stem}.{digest}{path.suffix}"
+        _write(output_dir / hashed, data)
+        for suffix, variant in variants.items():
+            _write(output_dir / (hashed + suffix), variant)
+        manifest[path.name] = hashed
+
+    _replace(output_dir / "manifest.json", json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+class AssetManifest:
+    """Resolves source asset names to their hashed URLs (falling back to /static)"""
+    def __init__(self, output: str, url_prefix: str = "/assets"):
+        self.output = output
+        self.url_prefix = url_prefix
+        self.entries: dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(os.path.join(self.output, "manifest.json")) as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def url(self, name: str) -> str:
+        """Path for `name`; templates prefix it with base_url"""
+        hashed = self.entries.get(name)
+        if hashed is None:
+            return f"/static/{name}"
+        return f"{self.url_prefix}/{hashed}"
+
+    def build(self, source: str) -> dict[str, str]:
+        self.entries = build_assets(source, self.output)
+        logger.info("Assets built: %d files", len(self.entries))
+        return self.entries
+
+    def is_stale(self, source: str) -> bool:
+        """True when any source file is newer than the manifest"""
+        try:
+            built_at = os.stat(os.path.join(self.output, "manifest.json")).st_mtime
+        except OSError:
+            return True
+        return any(path.stat().st_mtime > built_at for path in Path(source).iterdir() if path.is_file())
+
+    def ensure_built(self, source: str) -> dict[str, str]:
+        """Build only when the sources changed since the last build"""
+        if self.is_stale(source):
+            return self.build(source)
+        self.load()
+        return self.entries
+
+def new_asset_manifest() -> AssetManifest:
+    """Manifest factory, configured by ASSET_OUTPUT"""
+    return AssetManifest(env.assets["output"], env.assets["url_prefix"])
+
+assets = new_asset_manifest()
+
+if __name__ == "__main__":
+    manifest = assets.build(env.assets["source"])
+    print(json.dumps(manifest, indent=2))
@@ -0,0 +1,241 @@
+"""
+Compile-time email template transforms.
+
+    python -m core.utils.email_compiler
+
+Templates are rewritten once, when Jinja loads their source:
+stylesheet rules are inlined into `style` attributes (most mail clients
+ignore linked stylesheets) and insignificant whitespace is removed. The
+per-recipient render then only fills in the variables.
+
+The inliner understands the selectors `styles.css` uses: tags, classes,
+ids and descendant combinations of them. Rules with pseudo-classes,
+attribute selectors or other combinators are left to the stylesheet.
+Descendant selectors only match within one template file.
+
+Run as a module to print each template's rendered size with and without
+these transforms.
+"""
+import inspect
+import os
+import posixpath
+import re
+from html.parser import HTMLParser
+from typing import Callable, Optional
+from jinja2 import FileSystemLoader
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BLOCK_TAGS = "html|head|body|title|meta|link|style|div|p|ul|ol|li|footer|header|section|h[1-6]|table|thead|tbody|tr|td|th|br|hr"
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_COMPOUND = re.compile(r"^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$")
+_STYLE_ATTR = re.compile(r"""\sstyle\s*=\s*("[^"]*"|'[^']*')""", re.I)
+_TAG_END = re.compile(r"\s*(/?>)$")
+_WHITESPACE = re.compile(r"\s+")
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_AROUND_BLOCK = re.compile(rf"\s*(</?(?:{BLOCK_TAGS})\b[^>]*>)\s*", re.I)
+_END_TAG_SPACE = re.compile(r"</([a-zA-Z][\w-]*)\s+>")
+_PRESERVED = re.compile(r"(<(pre|textarea|script)\b.*?</\2>)", re.S | re.I)
+
+class _Selector:
+    """A descendant chain of compound selectors, e.g. `.banner h2`"""
+    def __init__(self, parts: list[tuple[Optional[str], set, Optional[str]]]):
+        self.parts = parts
+        self.specificity = (
+            sum(1 for _, _, id_ in parts if id_),
+            sum(len(classes) for _, classes, _ in parts),
+            sum(1 for tag, _, _ in parts if tag),
+        )
+
+    @staticmethod
+    def parse(text: str) -> Optional["_Selector"]:
+        parts = []
+        for compound in text.split():
+            match = _COMPOUND.match(compound)
+            if not match or not compound:
+                return None
+            names = re.findall(r"([.#])([\w-]+)", match.group(2))
+            ids = [name for kind, name in names if kind == "#"]
+            parts.append((
+                match.group(1).lower() if match.group(1) else None,
+                {name for kind, name in names if kind == "."},
+                ids[0] if ids else None,
+            ))
+        return _Selector(parts) if parts else None
+
+    @staticmethod
+    def _matches(part, element: tuple[str, set, Optional[str]]) -> bool:
+        tag, classes, id_ = part
+        return (tag is None or tag == element[0]) and classes <= element[1] and (id_ is None or id_ == element[2])
+
+    def matches(self, element: tuple, ancestors: list[tuple]) -> bool:
+        if not self._matches(self.parts[-1], element):
+            return False
+        remaining = self.parts[:-1]
+        for ancestor in reversed(ancestors):
+            if not remaining:
+                break
+            if self._matches(remaining[-1], ancestor):
+                remaining = remaining[:-1]
+        return not remaining
+
+def _declarations(text: str) -> list[tuple[str, str]]:
+    declarations = []
+    for declaration in text.split(";"):
+        name, _, value = declaration.partition(":")
+        if name.strip() and value.strip():
+            declarations.append((name.strip().lower(), _WHITESPACE.sub(" ", value.strip())))
+    return declarations
+
+def parse_stylesheet(css: str) -> list[tuple[_Selector, list[tuple[str, str]]]]:
+    """Inlinable (selector, declarations) rules in source order"""
+    rules = []
+    for selectors, body in _RULE.findall(_COMMENT.sub("", css)):
+        declarations = _declarations(body)
+        for text in selectors.split(","):
+            selector = _Selector.parse(text.strip())
+            if selector is not None and declarations:
+                rules.append((selector, declarations))
+    return rules
+
+def _merge(rules: list[tuple[_Selector, list]], inline: str) -> str:
+    """Cascade matched rules (by specificity, then order) under the element's own style"""
+    styles: dict[str, str] = {}
+    for _, declarations in sorted(rules, key=lambda rule: rule[0].specificity):
+        for name, value in declarations:
+            if "!important" not in styles.get(name, "") or "!important" in value:
+                styles.pop(name, None)
+                styles[name] = value
+    for name, value in _declarations(inline):
+        if "!important" not in styles.get(name, "") or "!important" in value:
+            styles.pop(name, None)
+            styles[name] = value
+    return ";".join(f"{name}:{value}" for name, value in styles.items()).replace('"', "'")
+
+class _Inliner(HTMLParser):
+    def __init__(self, rules: list):
+        super().__init__(convert_charrefs=False)
+        self.rules = rules
+        self.stack: list[tuple] = []
+        self.edits: list[tuple[tuple[int, int], str, str]] = []
+
+    def _element(self, tag: str, attrs: list) -> tuple:
+        attributes = dict(attrs)
+        return (tag, set((attributes.get("class") or "").split()), attributes.get("id"))
+
+    def _rewrite(self, tag: str, attrs: list):
+        element = self._element(tag, attrs)
+        raw = self.get_starttag_text()
+        matched = [rule for rule in self.rules if rule[0].matches(element, self.stack)]
+        inline = dict(attrs).get("style") or ""
+        rewritten = raw
+        if matched or inline:
+            style = _merge(matched, inline)
+            if _STYLE_ATTR.search(raw):
+                rewritten = _STYLE_ATTR.sub(lambda _: f' style="{style}"', raw, count=1)
+            else:
+                rewritten = _TAG_END.sub(lambda end: f' style="{style}"{end.group(1)}', raw, count=1)
+        rewritten = _TAG_END.sub(r"\1", _WHITESPACE.sub(" ", rewritten))
+        if rewritten != raw:
+            self.edits.append((self.getpos(), raw, rewritten))
+        return element
+
+    def handle_starttag(self, tag, attrs):
+        element = self._rewrite(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self._rewrite(tag, attrs)
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                del self.stack[depth:]
+                break
+
+def inline_css(source: str, rules: list) -> str:
+    """Inline `rules` (from `parse_stylesheet`) into the start tags of `source`"""
+    parser = _Inliner(rules)
+    parser.feed(source)
+    parser.close()
+    line_offsets = [0] + [newline.end() for newline in re.finditer("\n", source)]
+    output, position = [], 0
+    for (line, column), raw, rewritten in parser.edits:
+        start = line_offsets[line - 1] + column
+        output.append(source[position:start])
+        output.append(rewritten)
+        position = start + len(raw)
+    output.append(source[position:])
+    return "".join(output)
+
+def minify_html(source: str) -> str:
+    """Drop comments and whitespace that cannot affect rendering"""
+    chunks = _PRESERVED.split(source)
+    output = []
+    # re.split yields [text, preserved, tag name, text, ...]
+    for index in range(0, len(chunks), 3):
+        text = _HTML_COMMENT.sub("", chunks[index])
+        text = _WHITESPACE.sub(" ", text)
+        text = _AROUND_BLOCK.sub(r"\1", text)
+        text = _END_TAG_SPACE.sub(r"</\1>", text)
+        output.append(text)
+        if index + 1 < len(chunks):
+            output.append(chunks[index + 1])
+    return "".join(output).strip()
+
+def normalize_text(text: str) -> str:
+    """Dedent a plain-text part and collapse its blank-line runs"""
+    lines = [line.rstrip() for line in inspect.cleandoc(text).splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)) + "\n"
+
+class CompilingLoader(FileSystemLoader):
+    """
+    FileSystemLoader that inlines `stylesheet` and minifies every HTML
+    template it loads, recording source and compiled sizes per template.
+    """
+    def __init__(self, searchpath: str, stylesheet: str = ""):
+        super().__init__(searchpath)
+        self.stylesheet = stylesheet
+        self.sizes: dict[str, tuple[int, int]] = {}
+        self._rules: Optional[list] = None
+        self._rules_mtime: Optional[float] = None
+
+    def _stylesheet_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.stylesheet) if self.stylesheet else None
+        except OSError:
+            return None
+
+    def rules(self) -> list:
+        mtime = self._stylesheet_mtime()
+        if self._rules is None or mtime != self._rules_mtime:
+            css = ""
+            if mtime is not None:
+                with open(self.stylesheet, encoding="utf-8") as file:
+                    css = file.read()
+            self._rules, self._rules_mtime = parse_stylesheet(css), mtime
+        return self._rules
+
+    def get_source(self, environment, template: str) -> tuple[str, str, Callable[[], bool]]:
+        source, filename, uptodate = super().get_source(environment, template)
+        if not template.endswith(".html"):
+            return source, filename, uptodate
+        compiled = minify_html(inline_css(source, self.rules()))
+        self.sizes[posixpath.normpath(template)] = (len(source.encode()), len(compiled.encode()))
+        stylesheet_mtime = self._stylesheet_mtime()
+        return compiled, filename, lambda: uptodate() and self._stylesheet_mtime() == stylesheet_mtime
+
+if __name__ == "__main__":
+    import json
+    from core.utils.template_registry import TemplateRegistry, new_template_registry
+
+    # Static payload per template: rendered without variables, as written vs compiled
+    compiled = new_template_registry()
+    plain = TemplateRegistry(compiled.directory, compiled.base_url, auto_reload=False)
+    report = {}
+    for name in compiled.env.list_templates(extensions=["html"]):
+        before, after = len(plain.render(name, {}).encode()), len(compiled.render(name, {}).encode())
+        report[name] = {"plain": before, "compiled": after, "saved": f"{(before - after) / before:.1%}"}
+    print(json.dumps(report, indent=2))
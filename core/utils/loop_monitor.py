@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+from core.handlers.env_handler import env
+from core.utils.metrics import LOOP_LAG, LOOP_BLOCKS
+
+class LoopMonitor:
+    """
+    Event loop lag monitor and blocking-call detector.
+
+    A task sleeps for `interval` and records how late it wakes up; that
+    delay is the time any ready callback waits to be scheduled. Each wakeup
+    is also a heartbeat: a watchdog thread that sees no heartbeat for
+    `interval + block_threshold` takes the loop thread's current stack, so
+    the report points at the synchronous code (render, JWT, validation...)
+    holding the loop rather than at whatever ran after it.
+    """
+    def __init__(self, interval: float = 0.1, block_threshold: float = 0.1, max_reports: int = 50, stack_depth: int = 20):
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self.stack_depth = stack_depth
+        self.reports: deque = deque(maxlen=max_reports)
+        self.max_lag = 0.0
+        self.blocks = 0
+        self._heartbeat = time.monotonic()
+        self._open_report: Optional[dict] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start measuring on the running loop (and the watchdog, if a threshold is set)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        if self.block_threshold > 0:
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if self._open_report is not None:
+                # The block has ended; record how long it lasted in total
+                self._open_report["blocked_ms"] = round(lag * 1000, 1)
+                self._open_report = None
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is blocked."""
+        poll = max(self.block_threshold / 4, 0.005)
+        reported_beat = None
+        while not self._stopped.wait(poll):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.block_threshold or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported_beat = beat
+            self.blocks += 1
+            LOOP_BLOCKS.inc()
+            report = {
+                "detected_at": time.time(),
+                "blocked_ms": round(stalled * 1000, 1),
+                "stack": traceback.format_stack(frame, limit=self.stack_depth),
+            }
+            self._open_report = report
+            self.reports.append(report)
+
+    def stats(self) -> dict:
+        return {
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "blocks": self.blocks,
+            "reports": list(self.reports)[::-1],
+        }
+
+def new_loop_monitor() -> Optional[LoopMonitor]:
+    """Loop monitor factory (None when LOOP_MONITOR is off)"""
+    config = env.loop_monitor
+    if not config["enabled"]:
+        return None
+    return LoopMonitor(
+        interval=config["interval"],
+        block_threshold=config["block_threshold"],
+        max_reports=config["max_reports"],
+    )
@@ -0,0 +1,139 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Optional
+
+# Seconds; tuned for request/dependency latencies from sub-millisecond to 10s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_string(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Counter:
+    """Monotonic counter per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        # Updates happen on the event loop thread; plain dict ops need no lock
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_label_string(self.labels, key)} {value}" for key, value in self.values.items()]
+
+class Histogram:
+    """Fixed-bucket histogram per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum, count]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def time(self, *label_values):
+        """Decorator timing an async function into this histogram"""
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+            return wrapper
+        return decorator
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_label_string(self.labels + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_string(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_label_string(self.labels, key)} {series[-1]}")
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), collect: Optional[Callable[[], dict]] = None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+        self.values: dict[tuple, float] = {}
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+    def render(self) -> list[str]:
+        values = dict(self.values)
+        if self.collect is not None:
+            try:
+                values.update(self.collect())
+            except Exception:
+                pass
+        return [f"{self.name}{_label_string(self.labels, key)} {value}" for key, value in values.items()]
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, object] = {}
+
+    def _register(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, labels: tuple = (), collect: Optional[Callable[[], dict]] = None) -> Gauge:
+        return self._register(Gauge(name, help, labels, collect))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# Shared instruments
+HTTP_REQUESTS = metrics.counter("reach_http_requests_total", "HTTP responses by route and status", ("method", "route", "status"))
+HTTP_LATENCY = metrics.histogram("reach_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+MONGO_LATENCY = metrics.histogram("reach_mongo_operation_duration_seconds", "Mongo operation latency", ("operation",))
+EMAIL_SEND_LATENCY = metrics.histogram("reach_email_send_duration_seconds", "Email provider call latency per batch", ("transport",))
+EMAIL_MESSAGES = metrics.counter("reach_email_messages_total", "Messages handed to the provider by outcome", ("transport", "status"))
+TEMPLATE_RENDER_LATENCY = metrics.histogram("reach_template_render_duration_seconds", "Jinja render time", ("template",))
+RATE_LIMIT_REJECTIONS = metrics.counter("reach_rate_limit_rejections_total", "Requests rejected by the rate limiter", ("route",))
+LOOP_LAG = metrics.histogram("reach_event_loop_lag_seconds", "Event loop scheduling delay")
+LOOP_BLOCKS = metrics.counter("reach_event_loop_blocks_total", "Callbacks that blocked the loop past the threshold")
+LOG_RECORDS_DROPPED = metrics.counter("reach_log_records_dropped_total", "Log records dropped because the log queue was full")
@@ -0,0 +1,83 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import time
+from collections import deque
+from typing import Optional
+from core.handlers.env_handler import env
+
+class ProfileStore:
+    """
+    Bounded ring buffer of request profiles.
+
+    Uses cProfile, which profiles the whole thread: concurrent requests on
+    the same loop show up in a profile too, so only one request is profiled
+    at a time and the others run unprofiled.
+    """
+    def __init__(self, sample_rate: float = 0.0, max_profiles: int = 50, directory: Optional[str] = None, top: int = 40):
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.top = top
+        self.profiles: deque = deque(maxlen=max_profiles)
+        self.active = False
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def begin(self) -> Optional[cProfile.Profile]:
+        """Start profiling, unless another request already is"""
+        if self.active:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger or py-spy hook) owns the thread
+            return None
+        self.active = True
+        return profiler
+
+    def end(self, profiler: cProfile.Profile, pid: str, method: str, path: str, duration: float):
+        """Stop profiling and store the result under `pid`"""
+        profiler.disable()
+        self.active = False
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        if self.directory:
+            stats.dump_stats(os.path.join(self.directory, f"{int(time.time())}-{pid}.prof"))
+        self.profiles.append({
+            "pid": pid,
+            "method": method,
+            "path": path,
+            "duration_ms": round(duration * 1000, 3),
+            "recorded_at": time.time(),
+            "stats": output.getvalue(),
+        })
+
+    def get(self, pid: str) -> Optional[dict]:
+        for profile in reversed(self.profiles):
+            if profile["pid"] == pid:
+                return profile
+        return None
+
+    def recent(self) -> list[dict]:
+        return [
+            {key: value for key, value in profile.items() if key != "stats"}
+            for profile in reversed(self.profiles)
+        ]
+
+def new_profile_store() -> ProfileStore:
+    """Profile store factory, configured by PROFILE_SAMPLE_RATE, PROFILE_BUFFER_SIZE and PROFILE_DIR"""
+    config = env.profiling
+    return ProfileStore(
+        sample_rate=config["sample_rate"],
+        max_profiles=config["buffer_size"],
+        directory=config["directory"] or None,
+    )
+
+profiles = new_profile_store()
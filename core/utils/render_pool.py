@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Iterable, Optional
+from core.handlers.env_handler import env
+from core.utils.metrics import TEMPLATE_RENDER_LATENCY
+from core.utils.template_registry import TemplateRegistry, template_registry
+
+logger = logging.getLogger(__name__)
+
+# The registry each pool worker renders with, built once by `_init_worker`
+_worker_registry: Optional[TemplateRegistry] = None
+
+def _init_worker(directory: str, base_url: str, cache_dir: str, auto_reload: bool, compile: bool, stylesheet: str, ready, timeout: float):
+    global _worker_registry
+    _worker_registry = TemplateRegistry(directory, base_url, cache_dir, auto_reload, compile, stylesheet)
+    _worker_registry.compile_all()
+    # Hold this worker until every worker (and the parent) has arrived
+    ready.wait(timeout)
+
+def _render_chunk(registry: TemplateRegistry, name: str, contexts: list[dict]) -> list[tuple[str, float]]:
+    """Render one template for each context, with the time each render took"""
+    results = []
+    for variables in contexts:
+        start = time.perf_counter()
+        html = registry.render(name, variables)
+        results.append((html, time.perf_counter() - start))
+    return results
+
+def _render_in_worker(name: str, contexts: list[dict]) -> list[tuple[str, float]]:
+    return _render_chunk(_worker_registry, name, contexts)
+
+def _ready() -> bool:
+    return _worker_registry is not None
+
+class RenderPool:
+    """
+    Renders templates off the event loop.
+
+    `render_many` is for bulk sends: with `workers` > 0 it runs in a
+    process pool whose workers each compile the registry's templates once
+    at startup, so campaigns scale across cores instead of competing with
+    request handling. Contexts go to the workers in chunks of `chunk_size`
+    and `(index, html)` pairs are yielded as each chunk completes, so
+    callers can start sending before the whole batch is rendered. With 0
+    workers (the default until `start`), chunks run on the loop's thread
+    pool instead, which keeps them off the loop but shares the GIL.
+
+    `render` renders one message on the loop's thread pool: a single
+    compiled template renders faster than the round trip to a worker
+    process would take, and the thread keeps it off the loop.
+    """
+    def __init__(self, registry: TemplateRegistry = template_registry, workers: int = 0, chunk_size: int = 32, start_timeout: float = 60.0):
+        self.registry = registry
+        self.workers = max(0, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.start_timeout = start_timeout
+        self._executor: Optional[Executor] = None
+
+    async def start(self):
+        """Start the worker processes and wait until each has compiled the templates."""
+        if self.workers == 0 or self._executor is not None:
+            return
+        # Workers must not inherit the loop, sockets or threads of this process
+        context = multiprocessing.get_context("spawn")
+        ready = context.Barrier(self.workers + 1)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                self.registry.directory,
+                self.registry.base_url,
+                self.registry.cache_dir,
+                self.registry.auto_reload,
+                self.registry.compile,
+                self.registry.stylesheet,
+                ready,
+                self.start_timeout,
+            ),
+        )
+        # Spawn-context pools start one worker per submit while none is idle
+        for _ in range(self.workers):
+            self._executor.submit(_ready)
+        try:
+            await asyncio.to_thread(ready.wait, self.start_timeout)
+        except threading.BrokenBarrierError:
+            await self.close()
+            raise RuntimeError(f"Render pool workers did not start within {self.start_timeout}s")
+        logger.info("Render pool started: %d workers", self.workers)
+
+    async def close(self):
+        """Stop the worker processes, dropping renders that have not started."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _submit(self, name: str, contexts: list[dict]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            return loop.run_in_executor(None, _render_chunk, self.registry, name, contexts)
+        return loop.run_in_executor(self._executor, partial(_render_in_worker, name, contexts))
+
+    async def render(self, name: str, variables: dict) -> str:
+        """Render a single template on the loop's thread pool"""
+        [(html, seconds)] = await asyncio.to_thread(_render_chunk, self.registry, name, [variables])
+        TEMPLATE_RENDER_LATENCY.observe(seconds, name)
+        return html
+
+    async def render_many(self, name: str, contexts: Iterable[dict]) -> AsyncIterator[tuple[int, str]]:
+        """Render `name` once per context, yielding `(index, html)` in completion order"""
+        contexts = list(contexts)
+        pending = {
+            self._submit(name, contexts[offset:offset + self.chunk_size]): offset
+            for offset in range(0, len(contexts), self.chunk_size)
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    offset = pending.pop(future)
+                    for index, (html, seconds) in enumerate(future.result(), start=offset):
+                        TEMPLATE_RENDER_LATENCY.observe(seconds, name)
+                        yield index, html
+        finally:
+            for future in pending:
+                future.cancel()
+
+def new_render_pool() -> RenderPool:
+    """Render pool factory, sized by RENDER_WORKERS"""
+    return RenderPool(
+        template_registry,
+        workers=env.render["workers"],
+        chunk_size=env.render["chunk_size"],
+    )
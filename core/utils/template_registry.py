@@ -0,0 +1,110 @@
+import logging
+import os
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from markupsafe import Markup
+from core.handlers.env_handler import env
+from core.utils.assets import assets
+from core.utils.email_compiler import CompilingLoader
+
+logger = logging.getLogger(__name__)
+
+# Partials whose output is the same for every recipient, rendered once at startup
+INVARIANT_PARTIALS = ("head.html", "social-links.html")
+
+class TemplateRegistry:
+    """
+    The one Jinja environment shared by email rendering and the previews.
+
+    `compile_all` loads every template up front; compiled bytecode is kept
+    in `cache_dir` so restarts skip parsing. With `auto_reload` off
+    (production), compiled templates are held in a dict and files are never
+    stat-ed again.
+
+    Templates pull invariant partials in with `{{ partial('head.html') }}`
+    instead of `{% include %}`. A partial is rendered once per distinct
+    argument set (e.g. each banner text) and reused as markup, so a send
+    only renders the per-recipient parts.
+
+    With `compile`, template sources get `stylesheet` inlined and are
+    minified as they load (see `core.utils.email_compiler`).
+    """
+    def __init__(self,
+        directory: str = "templates",
+        base_url: str = "",
+        cache_dir: str = "",
+        auto_reload: bool = True,
+        compile: bool = False,
+        stylesheet: str = "",
+    ):
+        bytecode_cache = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        self.env = Environment(
+            loader=CompilingLoader(directory, stylesheet) if compile else FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=auto_reload,
+            bytecode_cache=bytecode_cache,
+        )
+        self.env.globals["asset"] = assets.url
+        self.env.globals["partial"] = self.partial
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.base_url = base_url
+        self.auto_reload = auto_reload
+        self.compile = compile
+        self.stylesheet = stylesheet
+        self.templates: dict[str, Template] = {}
+        self.partials: dict[tuple, Markup] = {}
+
+    def compile_all(self) -> int:
+        """Compile every template and pre-render the invariant partials"""
+        self.templates = {name: self.env.get_template(name) for name in self.env.list_templates(extensions=["html"])}
+        self.partials.clear()
+        for name in INVARIANT_PARTIALS:
+            self.partial(name)
+        for name, (source, compiled) in self.sizes().items():
+            logger.info("Template %s: %d -> %d bytes (%+.1f%%)", name, source, compiled, (compiled - source) / source * 100)
+        logger.info("Templates compiled: %d", len(self.templates))
+        return len(self.templates)
+
+    def sizes(self) -> dict[str, tuple[int, int]]:
+        """(source, compiled) bytes per template loaded so far; empty unless compiling"""
+        return dict(getattr(self.env.loader, "sizes", {}))
+
+    def get(self, name: str) -> Template:
+        """Compiled template by name; raises TemplateNotFound"""
+        if self.auto_reload:
+            return self.env.get_template(name)
+        template = self.templates.get(name)
+        if template is None:
+            template = self.templates[name] = self.env.get_template(name)
+        return template
+
+    def render(self, name: str, variables: dict) -> str:
+        return self.get(name).render(**variables)
+
+    def partial(self, name: str, **variables) -> Markup:
+        """Rendered partial, cached per argument set (not cached while auto-reloading)"""
+        key = (name, tuple(sorted(variables.items())))
+        html = None if self.auto_reload else self.partials.get(key)
+        if html is None:
+            html = Markup(self.get(name).render(base_url=self.base_url, **variables))
+            if not self.auto_reload:
+                if len(self.partials) >= 256:
+                    self.partials.clear()
+                self.partials[key] = html
+        return html
+
+def new_template_registry() -> TemplateRegistry:
+    """Registry factory; auto-reload is off in production"""
+    return TemplateRegistry(
+        directory="templates",
+        base_url=env.state["base_url"],
+        cache_dir=env.templates["cache_dir"],
+        auto_reload=env.templates["auto_reload"],
+        compile=env.templates["compile"],
+        stylesheet=os.path.join(env.assets["source"], "styles.css"),
+    )
+
+template_registry = new_template_registry()
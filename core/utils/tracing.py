@@ -0,0 +1,241 @@
+import atexit
+import logging
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+from core.handlers.env_handler import env
+
+logger = logging.getLogger(__name__)
+
+class Span:
+    """One timed operation inside a trace"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "error", "spans")
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        # Finished spans of the whole trace, shared by every span in it
+        self.spans: list = parent.spans if parent is not None else []
+
+    @property
+    def duration(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("reach_current_span", default=None)
+
+class _SpanScope:
+    """Context manager that makes a span current for its body (a no-op when unsampled)"""
+    def __init__(self, tracer: "Tracer", span: Optional[Span]):
+        self.tracer = tracer
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Optional[Span]:
+        if self.span is not None:
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        self.span.end = time.perf_counter()
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        self.span.spans.append(self.span)
+        if self.span.parent_id is None:
+            self.tracer.export(self.span)
+        return False
+
+class InMemoryExporter:
+    """Keeps the most recent traces for the admin endpoints"""
+    def __init__(self, max_traces: int = 200):
+        self.traces: deque = deque(maxlen=max_traces)
+
+    def export(self, trace: list[dict]):
+        self.traces.append(trace)
+
+    def get(self, trace_id: str) -> Optional[list[dict]]:
+        for trace in reversed(self.traces):
+            if trace and trace[0]["trace_id"] == trace_id:
+                return trace
+        return None
+
+    def recent(self, limit: int = 50) -> list[list[dict]]:
+        return list(self.traces)[-limit:][::-1]
+
+class FileExporter(InMemoryExporter):
+    """
+    Also appends each trace to a JSON lines file, for offline analysis.
+
+    Writes happen on a background thread, so a slow disk never stalls the
+    request that finished the trace; when `queue_size` traces are already
+    waiting, new ones are only kept in memory and counted in `dropped`.
+    The file is rotated to `<path>.1` .. `<path>.<backups>` once it would
+    grow past `max_bytes`.
+    """
+    def __init__(self, path: str, max_traces: int = 200, max_bytes: int = 10_000_000, backups: int = 3, queue_size: int = 1000):
+        super().__init__(max_traces)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def export(self, trace: list[dict]):
+        super().export(trace)
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued, then stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _write_loop(self):
+        file = None
+        try:
+            while True:
+                trace = self._queue.get()
+                if trace is None:
+                    return
+                try:
+                    line = json.dumps(trace, default=str) + "\n"
+                    if file is None:
+                        file = open(self.path, "a")
+                    if file.tell() and file.tell() + len(line) > self.max_bytes:
+                        file.close()
+                        file = None
+                        self._rotate()
+                        file = open(self.path, "a")
+                    file.write(line)
+                    file.flush()
+                except Exception as e:
+                    logger.error("Trace file write failed: %s", e)
+        finally:
+            if file is not None:
+                file.close()
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+class Tracer:
+    """
+    Span-based tracer with head sampling.
+
+    The sampling decision is made once per root span; unsampled requests
+    carry no current span, so every nested `span()` is a cheap no-op.
+    Spans are propagated through a ContextVar, which follows awaits and
+    tasks created inside the request.
+    """
+    def __init__(self, exporter: InMemoryExporter, sample_rate: float = 0.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, force: bool = False, **attributes) -> _SpanScope:
+        """Start a root span, subject to sampling (or `force`)"""
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return _SpanScope(self, None)
+        return _SpanScope(self, Span(name, os.urandom(16).hex(), attributes=attributes))
+
+    def span(self, name: str, **attributes) -> _SpanScope:
+        """Child span of the current one, if the current trace is sampled"""
+        parent = _current_span.get()
+        if parent is None:
+            return _SpanScope(self, None)
+        return _SpanScope(self, Span(name, parent.trace_id, parent, attributes))
+
+    def traced(self, name: str):
+        """Wrap a coroutine function in a span"""
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def export(self, root: Span):
+        spans = sorted(root.spans, key=lambda span: span.start)
+        try:
+            self.exporter.export([span.to_dict(root.start) for span in spans])
+        except Exception as e:
+            logger.error("Trace export failed: %s", e)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def waterfall(trace: list[dict], width: int = 40) -> str:
+    """Render a finished trace as a text waterfall, children indented under parents"""
+    if not trace:
+        return ""
+    root = next((span for span in trace if span["parent_id"] is None), trace[0])
+    total = root["duration_ms"] or 1e-9
+    children: dict = {}
+    for span in trace:
+        children.setdefault(span["parent_id"], []).append(span)
+
+    lines = [f"trace {root['trace_id']}  {root['name']}  {root['duration_ms']:.2f}ms"]
+    def walk(span: dict, depth: int):
+        start = int(span["offset_ms"] / total * width)
+        length = max(1, int(span["duration_ms"] / total * width))
+        bar = " " * start + "█" * min(length, width - start)
+        label = "  " * depth + span["name"]
+        if span["error"]:
+            label += f"  !{span['error']}"
+        lines.append(f"{span['offset_ms']:9.2f}ms {span['duration_ms']:9.2f}ms |{bar:<{width}}| {label}")
+        for child in children.get(span["span_id"], []):
+            walk(child, depth + 1)
+    walk(root, 0)
+    return "\n".join(lines)
+
+def new_tracer() -> Tracer:
+    """Tracer factory, configured by TRACE_SAMPLE_RATE and TRACE_EXPORTER (memory|file)"""
+    config = env.tracing
+    if config["exporter"] == "file":
+        exporter = FileExporter(config["file"], config["buffer_size"], config["file_max_bytes"], config["file_backups"])
+    else:
+        exporter = InMemoryExporter(config["buffer_size"])
+    return Tracer(exporter, config["sample_rate"])
+
+tracer = new_tracer()
@@ -0,0 +1,80 @@
+"""
+Local stand-in for the Mailjet v3.1 send API.
+
+Point `MAILJET_API_URL` at it to exercise the real HTTP transport offline:
+
+    python -m fakes.mailjet_server --port 8025 --latency 0.05
+"""
+import argparse
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+class FakeMailjet:
+    """Accepts sends, records them in memory and replies with v3.1 per-message statuses."""
+    def __init__(self, latency: float = 0.0, fail_domain: str = "fail.test"):
+        self.latency = latency
+        self.fail_domain = fail_domain
+        self.requests = 0
+        self.messages: list[dict] = []
+        self.app = Starlette(routes=[Route("/v3.1/send", self.send, methods=["POST"])])
+
+    async def send(self, request: Request):
+        """Handle POST /v3.1/send"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        payload = await request.json()
+        messages = payload.get("Messages") or []
+        results = []
+        for message in messages:
+            recipients = message.get("To") or []
+            if any(r.get("Email", "").endswith(f"@{self.fail_domain}") for r in recipients):
+                results.append({
+                    "Status": "error",
+                    "Errors": [{"ErrorCode": "mj-0013", "StatusCode": 400, "ErrorMessage": "Recipient rejected"}],
+                })
+                continue
+            self.messages.append(message)
+            results.append({
+                "Status": "success",
+                "To": [{"Email": r.get("Email"), "MessageUUID": str(uuid.uuid4())} for r in recipients],
+            })
+        status_code = 200 if all(r["Status"] == "success" for r in results) else 400
+        return JSONResponse({"Messages": results}, status_code=status_code)
+
+@asynccontextmanager
+async def running_fake_mailjet(fake: FakeMailjet, host: str = "127.0.0.1", port: int = 8025):
+    """Serve `fake` on host:port for the duration of the block."""
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    config.accesslog = None
+    config.errorlog = None
+    stopped = asyncio.Event()
+    server = asyncio.create_task(serve(fake.app, config, shutdown_trigger=stopped.wait))
+    await asyncio.sleep(0.1)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        stopped.set()
+        await server
+
+async def _main(args):
+    fake = FakeMailjet(latency=args.latency, fail_domain=args.fail_domain)
+    async with running_fake_mailjet(fake, args.host, args.port) as url:
+        print(f"Fake Mailjet listening on {url}")
+        await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-domain", default="fail.test")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,340 @@
+"""
+In-memory, Motor-compatible stand-in for the parts of MongoDB this app uses.
+
+Supports the collection methods called by the repositories (inserts,
+find/find_one with projections and sorting, find_one_and_update with
+upserts, update/delete, unique indexes) and the query operators they use.
+It is meant for benchmarks and local runs, not as a general Mongo emulator.
+"""
+import copy
+import itertools
+from typing import Any, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+_MISSING = object()
+
+def _get(document: dict, path: str) -> Any:
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _set(document: dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+def _compare(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, operand in condition.items():
+            present = value is not _MISSING
+            if operator == "$eq" and not (present and value == operand):
+                return False
+            if operator == "$ne" and present and value == operand:
+                return False
+            if operator == "$gt" and not (present and value is not None and value > operand):
+                return False
+            if operator == "$gte" and not (present and value is not None and value >= operand):
+                return False
+            if operator == "$lt" and not (present and value is not None and value < operand):
+                return False
+            if operator == "$lte" and not (present and value is not None and value <= operand):
+                return False
+            if operator == "$in" and not (present and value in operand):
+                return False
+            if operator == "$nin" and present and value in operand:
+                return False
+            if operator == "$exists" and present != bool(operand):
+                return False
+        return True
+    if value is _MISSING:
+        return condition is None
+    return value == condition
+
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif not _compare(_get(document, key), condition):
+            return False
+    return True
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    included = [key for key, flag in projection.items() if flag and key != "_id"]
+    if included:
+        result = {}
+        for key in included:
+            value = _get(document, key)
+            if value is not _MISSING:
+                _set(result, key, copy.deepcopy(value))
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    result = copy.deepcopy(document)
+    for key, flag in projection.items():
+        if not flag:
+            result.pop(key, None)
+    return result
+
+def _sort_key(sort: list):
+    def key(document):
+        values = []
+        for field, direction in sort:
+            value = _get(document, field)
+            values.append((value is _MISSING or value is None, value if value not in (_MISSING, None) else 0))
+        return values
+    return key
+
+def _apply_update(document: dict, update: dict, inserting: bool = False):
+    for operator, fields in update.items():
+        if operator == "$set":
+            for path, value in fields.items():
+                _set(document, path, copy.deepcopy(value))
+        elif operator == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    _set(document, path, copy.deepcopy(value))
+        elif operator == "$inc":
+            for path, value in fields.items():
+                current = _get(document, path)
+                _set(document, path, (0 if current is _MISSING else current) + value)
+        elif operator == "$unset":
+            for path in fields:
+                parts = path.split(".")
+                target = _get(document, ".".join(parts[:-1])) if len(parts) > 1 else document
+                if isinstance(target, dict):
+                    target.pop(parts[-1], None)
+        else:
+            raise NotImplementedError(f"Update operator {operator} is not supported")
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+class MemoryCursor:
+    """Async-iterable cursor over a snapshot of matching documents."""
+    def __init__(self, documents: list[dict]):
+        self._documents = documents
+        self._position = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._position >= len(self._documents):
+            raise StopAsyncIteration
+        document = self._documents[self._position]
+        self._position += 1
+        return document
+
+    async def to_list(self, length: Optional[int] = None) -> list[dict]:
+        remaining = self._documents[self._position:]
+        if length is not None:
+            remaining = remaining[:length]
+        self._position += len(remaining)
+        return remaining
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: list[dict] = []
+        self.indexes: dict[str, dict] = {"_id_": {"key": [("_id", 1)], "v": 2}}
+        self.operations = itertools.count()
+
+    # Indexes
+    async def create_index(self, keys, name: Optional[str] = None, **options) -> str:
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        keys = list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        spec = {"key": keys, "v": 2}
+        spec.update({key: value for key, value in options.items() if key != "background"})
+        self.indexes[name] = spec
+        return name
+
+    async def index_information(self) -> dict:
+        return copy.deepcopy(self.indexes)
+
+    async def drop_index(self, name: str):
+        self.indexes.pop(name, None)
+
+    def _check_unique(self, document: dict, ignore: Optional[dict] = None):
+        for name, spec in self.indexes.items():
+            if not spec.get("unique"):
+                continue
+            fields = [field for field, _ in spec["key"]]
+            if spec.get("partialFilterExpression") and not matches(document, spec["partialFilterExpression"]):
+                continue
+            values = [_get(document, field) for field in fields]
+            for other in self.documents:
+                if other is ignore or other is document:
+                    continue
+                if spec.get("partialFilterExpression") and not matches(other, spec["partialFilterExpression"]):
+                    continue
+                if [_get(other, field) for field in fields] == values:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}", 11000)
+
+    # Writes
+    async def insert_one(self, document: dict):
+        next(self.operations)
+        document.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(document)
+        self._check_unique(stored)
+        self.documents.append(stored)
+        return _Result(inserted_id=document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True):
+        next(self.operations)
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            document.setdefault("_id", ObjectId())
+            stored = copy.deepcopy(document)
+            try:
+                self._check_unique(stored)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+                continue
+            self.documents.append(stored)
+            inserted.append(document["_id"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return _Result(inserted_ids=inserted, acknowledged=True)
+
+    def _find_matches(self, query: dict, sort: Optional[list] = None) -> list[dict]:
+        found = [document for document in self.documents if matches(document, query or {})]
+        if sort:
+            for field, direction in reversed(sort):
+                found.sort(key=_sort_key([(field, direction)]), reverse=direction < 0)
+        return found
+
+    async def find_one_and_update(self,
+        query: dict,
+        update: dict,
+        projection: Optional[dict] = None,
+        sort: Optional[list] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **_,
+    ) -> Optional[dict]:
+        next(self.operations)
+        found = self._find_matches(query, sort)
+        if not found:
+            if not upsert:
+                return None
+            document = {key: copy.deepcopy(value) for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+            _apply_update(document, update, inserting=True)
+            document.setdefault("_id", ObjectId())
+            self._check_unique(document)
+            self.documents.append(document)
+            return _project(document, projection) if return_document == ReturnDocument.AFTER else None
+        document = found[0]
+        before = copy.deepcopy(document)
+        candidate = copy.deepcopy(document)
+        _apply_update(candidate, update)
+        self._check_unique(candidate, ignore=document)
+        document.clear()
+        document.update(candidate)
+        return _project(document if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, **_):
+        next(self.operations)
+        found = self._find_matches(query)
+        if not found:
+            if upsert:
+                await self.find_one_and_update(query, update, upsert=True)
+                return _Result(matched_count=0, modified_count=0, upserted_id=self.documents[-1]["_id"])
+            return _Result(matched_count=0, modified_count=0, upserted_id=None)
+        document = found[0]
+        before = copy.deepcopy(document)
+        candidate = copy.deepcopy(document)
+        _apply_update(candidate, update)
+        self._check_unique(candidate, ignore=document)
+        document.clear()
+        document.update(candidate)
+        return _Result(matched_count=1, modified_count=int(before != document), upserted_id=None)
+
+    async def update_many(self, query: dict, update: dict, **_):
+        next(self.operations)
+        modified = 0
+        found = self._find_matches(query)
+        for document in found:
+            before = copy.deepcopy(document)
+            _apply_update(document, update)
+            modified += int(before != document)
+        return _Result(matched_count=len(found), modified_count=modified)
+
+    async def delete_one(self, query: dict):
+        next(self.operations)
+        found = self._find_matches(query)
+        if found:
+            self.documents.remove(found[0])
+        return _Result(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query: dict):
+        next(self.operations)
+        found = self._find_matches(query)
+        for document in found:
+            self.documents.remove(document)
+        return _Result(deleted_count=len(found))
+
+    # Reads
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None, **_):
+        next(self.operations)
+        found = self._find_matches(query or {})
+        return _project(found[0], projection) if found else None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, sort: Optional[list] = None, limit: int = 0, **_):
+        next(self.operations)
+        found = self._find_matches(query or {}, sort)
+        if limit:
+            found = found[:limit]
+        return MemoryCursor([_project(document, projection) for document in found])
+
+    async def count_documents(self, query: dict, **_) -> int:
+        return len(self._find_matches(query))
+
+class MemoryDatabase:
+    def __init__(self, name: str = "devarno"):
+        self.name = name
+        self._collections: dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        return self[name]
+
+    async def command(self, command: str, **_) -> dict:
+        return {"ok": 1}
+
+class MemoryMongoClient:
+    """Drop-in for core.clients.mongo_client.MongoClient"""
+    def __init__(self, db_name: str = "devarno"):
+        self.db = MemoryDatabase(db_name)
+
+    async def ping(self):
+        return self.db
+
+    async def close(self):
+        pass
+
+    def get_client(self):
+        return self
+
+    def get_database(self, db_name: str):
+        return self.db
@@ -0,0 +1,67 @@
+"""
+Local SMTP stand-in built on aiosmtpd (from requirements-dev.txt).
+
+Point `SMTP_HOST`/`SMTP_PORT` at it with `EMAIL_TRANSPORT=smtp`. It does
+not offer STARTTLS, so also set `SMTP_START_TLS=False` unless SMTP_HOST is
+localhost (where that is the default):
+
+    python -m fakes.smtp_server --port 8026 --username reach --password reach
+"""
+import argparse
+import time
+from contextlib import contextmanager
+from typing import Optional
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult, LoginPassword
+
+class FakeSmtp:
+    """Records every delivered envelope and counts sessions."""
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None):
+        self.username = username
+        self.password = password
+        self.sessions = 0
+        self.envelopes: list = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        if isinstance(auth_data, LoginPassword):
+            ok = auth_data.login.decode() == self.username and auth_data.password.decode() == self.password
+            return AuthResult(success=ok)
+        return AuthResult(success=False, handled=False)
+
+@contextmanager
+def running_fake_smtp(fake: FakeSmtp, host: str = "127.0.0.1", port: int = 8026):
+    """Serve `fake` on host:port (plain text, AUTH allowed without TLS) for the block."""
+    auth = fake.username is not None
+    controller = Controller(
+        fake,
+        hostname=host,
+        port=port,
+        authenticator=fake.authenticate if auth else None,
+        auth_require_tls=False,
+    )
+    controller.start()
+    try:
+        yield (host, port)
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8026)
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+    with running_fake_smtp(FakeSmtp(args.username, args.password), args.host, args.port):
+        print(f"Fake SMTP listening on {args.host}:{args.port}")
+        while True:
+            time.sleep(3600)